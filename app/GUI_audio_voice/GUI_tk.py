@@ -7,8 +7,8 @@ from .core_UI import CoreUI
 #---------
 
 class tkTextBoxGUI(CoreUI):
-    def __init__(self, title:str):
-        super().__init__()                              # initiate parent class
+    def __init__(self, title:str, whisper_settings:dict=None):
+        super().__init__(whisper_settings)              # initiate parent class
 
         try:
             windll.shcore.SetProcessDpiAwareness(1)     # this makes it so that text is not blurry!
@@ -0,0 +1,116 @@
+from queue import Queue
+from abc import ABC, abstractmethod
+
+class BaseUI(ABC):
+    def __init__(self):
+        """
+        The base class of all UI backends. Handles the user input queue, and defines every other method 
+        which the App uses to interact with a UI. Any UI backend must subclass this and override every abstract method 
+        (a backend which is missing any of them fails as soon as it's instantiated, instead of once the App calls it).
+        """
+        self._input_q = Queue()                 # stores user input events
+        self._input_callback = None             # called whenever new input is stored (see `set_input_callback()`)
+
+    #---------
+    # user-input collection
+
+    def _store_input(self, type:str, data):
+        """Store user input in the input queue. Must specify the type of input and pass in the input data.
+        `type` must be a string with one of the following values:
+        - `TEXT` - input came from text input (typed in)
+        - `VOICE` - input came from vocal audio input
+        - `VOICE_PARTIAL` - the partial transcription of vocal audio input which is still being captured. The data is a tuple of (phrase id, text)
+        - `BTN_SOFT` - input came from software (GUI) button press or other input element event
+        - `BTN_HARD` - input came from hardware button press or other hardware event
+        """
+        if type in ("TEXT", "VOICE", "VOICE_PARTIAL", "BTN_SOFT", "BTN_HARD"):
+            self._input_q.put((type, data))
+            if self._input_callback:
+                self._input_callback()
+
+    def set_input_callback(self, func):
+        """Set a function (which takes no arguments) to be called whenever new user input is stored, 
+        so that input can be waited for instead of repeatedly checked for"""
+        if callable(func):
+            self._input_callback = func
+
+    def set_vocab_hint(self, vocab:list):
+        """Hint the vocabulary which the next voice inputs will most likely be transcribed with first (ex: so that they can be 
+        decoded while they're still being captured). UI backends without voice input can ignore this"""
+        pass
+
+    def discard_voice_phrase(self, phrase_id:int):
+        """Discard the voice input phrase which a `VOICE_PARTIAL` input came from, so that it isn't also stored as `VOICE` input once 
+        it's done being captured (ex: if its partial transcription already met a command). UI backends without voice input can ignore this"""
+        pass
+
+    def get_voice_phrase_id(self, audio:bytes) -> int|None:
+        """Get the phrase id of `VOICE` input audio (the same id as its `VOICE_PARTIAL` inputs), so that the App can skip a phrase which 
+        already met a command while it was captured, even if it was already stored as input. Returns None if it has no partial inputs"""
+        return None
+
+    def get_startup_times(self) -> dict:
+        """Get a dict of the name of each UI component and the number of seconds it took to initialize or load. 
+        Components which load in the background only appear once they're done loading"""
+        return {}
+
+    def set_startup_callback(self, func):
+        """Set a function to be called with (component name, seconds taken to load it) once each component which loads in 
+        the background is done loading (see `get_startup_times()`). UI backends without any background components can ignore this"""
+        pass
+
+    def has_input(self) -> bool:
+        """return `True` if there is any user input in the input queue, `False` if not"""
+        return not self._input_q.empty()
+
+    def get_input(self) -> tuple|None:
+        """Get the oldest user input entry in input queue. Returns a tuple containing input type and the input data.
+        Is non-blocking, and will return None if there is no input"""
+        try:
+            return self._input_q.get(block=False)
+        except:
+            return None
+
+    #---------
+    # methods which every UI backend must override
+
+    @abstractmethod
+    def transcribe_audio(self, audio:bytes, vocab:list=None) -> str:
+        """Transcribe phrase audio data into text, using only the words in `vocab` (if provided). The text can also have 
+        a `confidence` attribute (see `speech_proc.Transcription`), which lets the App skip transcribing it a second time"""
+        pass
+
+    @abstractmethod
+    def mainview_append(self, text:str, tag_name:str):
+        """Output a string of text. `tag_name` is either 'left' (output from the app) or 'right' (the user's input)"""
+        pass
+
+    @abstractmethod
+    def say(self, message:str, wpm:int=200, wait:bool=False):
+        """Output a string message as speech"""
+        pass
+
+    @abstractmethod
+    def silence(self):
+        """Stop any currently playing output audio"""
+        pass
+
+    @abstractmethod
+    def is_listening(self) -> bool:
+        """return `True` if UI is listening for voice, `False` if not"""
+        pass
+
+    @abstractmethod
+    def stop_listening(self):
+        """Stop listening for voice input phrases"""
+        pass
+
+    @abstractmethod
+    def run(self):
+        """Start running the UI. This must be called from the main thread, and will block until `stop()` is called"""
+        pass
+
+    @abstractmethod
+    def stop(self):
+        """Stop running the UI"""
+        pass
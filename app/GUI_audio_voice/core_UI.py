@@ -1,57 +1,50 @@
-from queue import Queue
 from threading import Lock, Event, Thread
-from time import time, sleep
+from time import time, perf_counter
 from os import path
 from io import BytesIO
 import wave
-import pyttsx4
 from .speech_proc import SpeechProcessor
 from .play_rec_audio import PlayAudio
+from .base_UI import BaseUI
 
 SOUNDS_DIR = path.join(path.dirname(__file__), 'sounds')
 TONES_1_5 = path.join(SOUNDS_DIR, '1_5.wav')
 TONES_5_1 = path.join(SOUNDS_DIR, '5_1.wav') 
 
-class CoreUI():
-    def __init__(self):
+class CoreUI(BaseUI):
+    def __init__(self, whisper_settings:dict=None):
         """
         The primary UI class. Handles input collection queue, voice input, voice output generation, and audio playback.
+        `whisper_settings` (optional) can override any of the full vocabulary transcriber's settings (see `speech_proc.WHISPER_SETTINGS`).
         """
-        self._input_q = Queue()                 # stores user input events
+        super().__init__()                      # initiate parent class (input collection queue)
+        self._startup_times = {}                # component name -> seconds taken to initialize it (see `get_startup_times()`)
+        start_time = perf_counter()
         
-        self._speech_proc = SpeechProcessor()   # speech recognition - phrase listener and transcriber
+        self._speech_proc = SpeechProcessor(streaming=True, whisper_settings=whisper_settings)     # speech recognition - phrase listener and transcriber (its models load in the background, and phrases are decoded while captured)
+        self._speech_proc.set_partial_callback(self._store_partial_voice_input)
+        self._startup_times["speech_processor"] = perf_counter() - start_time
         self._listening = Event()               # keeps track of whether or not to capture and store voice input
         self._use_wakeword = Event()            # keeps track of whether or not to use and listen for wakeword
         self.wakewords = ["computer"]           # the word(s) used for wakeword system
         self.timeout = 5                        # number of seconds to wait, when not receiving voice input, before stopping listening
 
+        start_time = perf_counter()
         self._audio_player = PlayAudio()        # for playing any program sounds
+        self._startup_times["audio_player"] = perf_counter() - start_time
         
+        start_time = perf_counter()
+        import pyttsx4                          # (imported here rather than at the top, as it's slow to import)
         self._tts_engine = pyttsx4.init()       # speech-generation/tts engine
+        self._startup_times["tts_engine"] = perf_counter() - start_time
 
         self._sound_lock = Lock()               # lock used to safely call sound related methods from different threads
-    
-    #---------
-    # user-input collection
-
-    def _store_input(self, type:str, data):
-        """Store user input in the input queue. Must specify the type of input and pass in the input data.
-        `type` must be a string with one of the following values:
-        - `TEXT` - input came from text input (typed in)
-        - `VOICE` - input came from vocal audio input
-        - `BTN_SOFT` - input came from software (GUI) button press or other input element event
-        - `BTN_HARD` - input came from hardware button press or other hardware event
-        """
-        if type in ("TEXT", "VOICE", "BTN_SOFT", "BTN_HARD"):
-            self._input_q.put((type, data))
 
-    def get_input(self) -> tuple|None:
-        """Get the oldest user input entry in input queue. Returns a tuple containing input type and the input data.
-        Is non-blocking, but will wait 1/100th of a second before returning with None if there is no input"""
-        try:
-            return self._input_q.get(block=False)
-        except:
-            return None
+    def get_startup_times(self) -> dict:
+        return {**self._startup_times, **{"speech_processor." + name: t for name, t in self._speech_proc.startup_times.items()}}
+
+    def set_startup_callback(self, func):
+        self._speech_proc.set_model_loaded_callback(lambda name, seconds: func("speech_processor." + name, seconds))
 
     #---------
     # speech recognition
@@ -62,18 +55,20 @@ class CoreUI():
             if time() >= target_time:                               # if current time is past target time, stop listening
                 self.stop_listening()
                 continue
-            audio = self._speech_proc.get_phrase(no_wait=True)      # check for audio without waiting
-            if not audio:                                           # if there's no audio currently available, 
-                sleep(0.1)                                          # sleep for moment and continue to next cycle (bypass everything below)
-                continue
+            audio = self._speech_proc.get_phrase(timeout=target_time - time())  # wait for audio until the target time (or until woken up by `stop_listening()`)
+            if not audio or not self._listening.is_set():           # if there's no audio or listening was stopped while waiting,
+                continue                                            # continue to next cycle (bypass everything below)
             self._store_input("VOICE", audio)                       # store this input in the input queue
             target_time = time() + self.timeout                     # reset target time
 
+    def _store_partial_voice_input(self, phrase_id:int, text:str):
+        if self._listening.is_set():                                # (partial transcriptions are only input while listening, not while checking for the wakeword)
+            self._store_input("VOICE_PARTIAL", (phrase_id, text))
+
     def _check_for_wakeword(self):
         while self._use_wakeword.is_set():
-            audio = self._speech_proc.get_phrase(no_wait=True)      # check for audio without waiting
-            if not audio:                                           # if there's no audio currently available, 
-                sleep(0.1)                                          # sleep for moment and continue to next cycle (bypass everything below)
+            audio = self._speech_proc.get_phrase()                  # wait for audio (or until woken up by `stop_wakeword_detection()`)
+            if not audio:                                           # if there's no audio, continue to next cycle (bypass everything below)
                 continue
             if not self._listening.is_set():                        # if not already listening for phrases, then check input for wakeword
                 text = self.transcribe_audio(audio, self.wakewords) # if wakeword(s) was provided, transcribe audio to see if it has wakeword
@@ -90,6 +85,7 @@ class CoreUI():
     def stop_wakeword_detection(self):
         self._use_wakeword.clear()
         self._speech_proc.stop_stream()
+        self._speech_proc.wake_phrase_waiter()
 
     def start_listening(self):
         """Start listening for voice input phrases"""
@@ -103,11 +99,21 @@ class CoreUI():
     def stop_listening(self):
         """Stop listening for voice input phrases"""
         self._listening.clear()
+        self._speech_proc.wake_phrase_waiter()
         self.prog_sound("DONE")
 
         if not self._use_wakeword.is_set():
             self._speech_proc.stop_stream()
 
+    def set_vocab_hint(self, vocab:list):
+        self._speech_proc.set_stream_vocabulary(" ".join(vocab) if vocab else None)
+
+    def discard_voice_phrase(self, phrase_id:int):
+        self._speech_proc.discard_phrase(phrase_id)
+
+    def get_voice_phrase_id(self, audio:bytes) -> int|None:
+        return self._speech_proc.get_phrase_id(audio)
+
     def transcribe_audio(self, audio:bytes, vocab:list=None) -> str:
         """Transcribe phrase audio data into text.
         `vocabulary` must be a list of words.
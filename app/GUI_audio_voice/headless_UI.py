@@ -0,0 +1,54 @@
+from threading import Event
+from collections import deque
+from .base_UI import BaseUI
+
+class HeadlessUI(BaseUI):
+    def __init__(self, output_func=None):
+        """
+        A UI backend without any window, audio devices, or speech models, for running the App on servers, in workers, or in tests.
+        Input is given with `submit_text()`. All output text is passed to `output_func(text, tag_name)` if provided, 
+        otherwise it is kept in `outputs` (only the most recent 1000).
+        """
+        super().__init__()
+        self.outputs = deque(maxlen=1000)       # (text, tag_name) tuples of all output (if no `output_func` was provided)
+        self._output_func = output_func if output_func else lambda text, tag_name: self.outputs.append((text, tag_name))
+        self._stopped = Event()
+
+    #---------
+    # input
+
+    def submit_text(self, text:str):
+        """Give the App a text input, as if it was typed in"""
+        self._store_input("TEXT", text)
+
+    #---------
+    # output
+
+    def transcribe_audio(self, audio:bytes, vocab:list=None) -> str:
+        """There is no speech recognition without audio, so this will always return an empty string"""
+        return ""
+
+    def mainview_append(self, text:str, tag_name:str):
+        self._output_func(text, tag_name)
+
+    def say(self, message:str, wpm:int=200, wait:bool=False):
+        pass                                    # (any message said is also appended to output by the App)
+
+    def silence(self):
+        pass
+
+    def is_listening(self) -> bool:
+        return False
+
+    def stop_listening(self):
+        pass
+
+    #---------
+    # methods which start or stop running UI
+
+    def run(self):
+        """Block until `stop()` is called"""
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
@@ -5,11 +5,21 @@ Two classes that uses the Pyaduio module to start, pause, and stop audio playing
 * `RecAudio` for recording audio
 """
 
-import pyaudio
 import wave
 from time import sleep
+from threading import Lock
 
-pa = pyaudio.PyAudio()                      # instantiate PyAudio
+_pa = None                                  # the shared PyAudio instance (only created once audio is first played or recorded)
+_pa_lock = Lock()
+
+def _get_pa():
+    """Get the shared PyAudio instance, importing PyAudio and instantiating it on first use"""
+    global _pa
+    with _pa_lock:
+        if _pa is None:
+            import pyaudio
+            _pa = pyaudio.PyAudio()         # instantiate PyAudio
+        return _pa
 
 class _BaseAudio:
     """
@@ -65,6 +75,7 @@ class PlayAudio(_BaseAudio):
         Play audio in a separate thread (non-blocking).
         If `wait` is set to true, then this WILL block for the duration of the audio.
         """
+        import pyaudio
         self.stop()                         # if there is already an open stream, close it first
 
         self.file = wave.open(audio_file_path, 'rb')
@@ -78,6 +89,7 @@ class PlayAudio(_BaseAudio):
             return (data, pyaudio.paContinue)
 
         # open stream with PyAudio-instance's open()
+        pa = _get_pa()
         self.stream = pa.open(
             format = pa.get_format_from_width(self.file.getsampwidth()),
             channels = self.file.getnchannels(),
@@ -112,6 +124,7 @@ class RecAudio(_BaseAudio):
     """
 
     def __init__(self):
+        import pyaudio
         self.CHUNK = 1024                   # https://dsp.stackexchange.com/questions/13728/what-are-chunks-when-recording-a-voice-signal
         self.FORMAT = pyaudio.paInt16       # https://people.csail.mit.edu/hubert/pyaudio/docs/#pasampleformat
         self.CHANNELS = 1
@@ -170,6 +183,7 @@ class RecAudio(_BaseAudio):
 
         Call `stop_and_return()` to stop recording and return the audio data (bytes)
         """
+        import pyaudio
         self.stop()                         # if there is already an open stream, close it first
 
         def callback(in_data, frame_count, time_info, status):
@@ -181,7 +195,7 @@ class RecAudio(_BaseAudio):
                 self.audio_frames.append(in_data)
             return (in_data, pyaudio.paContinue)
 
-        self.stream = pa.open(
+        self.stream = _get_pa().open(
             format=self.FORMAT,
             channels=self.CHANNELS,
             rate=self.RATE,
@@ -205,7 +219,7 @@ class RecAudio(_BaseAudio):
         Takes raw audio data (bytes) and writes it to a wav file
         """
         if audio_data and isinstance(audio_data, bytes):                # first check that audio data is not none and is a bytes type
-            sample_width  = pa.get_sample_size(self.FORMAT)
+            sample_width  = _get_pa().get_sample_size(self.FORMAT)
 
             with wave.open(file_path, 'wb') as file:
                 file.setnchannels(self.CHANNELS)
@@ -1,55 +1,163 @@
 from os import path
 import json
-import numpy as np
 from queue import Queue
-from vosk import Model, KaldiRecognizer, SetLogLevel
-from faster_whisper import WhisperModel
+from threading import Thread, Lock
+from concurrent.futures import Future
+from collections import OrderedDict
+from functools import partial
+from hashlib import blake2b
+from time import perf_counter
+from traceback import print_exc
 from .play_rec_audio import RecAudio
 
+# numpy, vosk, and faster_whisper are slow to import, so they're only imported when first used
+
+UNKNOWN_WORD = "[unk]"                                          # the word vosk transcribes any word outside of its vocabulary as
+
+# the default settings of the full vocabulary transcriber (faster-whisper) on machines with a CUDA GPU, and the latency/accuracy trade-off of each:
+WHISPER_SETTINGS = {
+    "model_size":   "tiny.en",      # "tiny.en", "base.en", "small.en", "medium.en", or "large-v3". each size up is roughly 2-3x slower on CPU, and more accurate (most of all with names and uncommon words)
+    "device":       "auto",         # "cpu", "cuda", or "auto" (cuda if it's available)
+    "compute_type": "default",      # "int8" is the fastest on CPU (roughly 2-4x faster than "float32"), and loses very little accuracy. "float16" or "int8_float16" on GPU. "default" keeps the type the model was saved as
+    "cpu_threads":  0,              # the threads used by each transcription (0 for the default of 4). more threads lower latency up to the number of physical cores, without changing accuracy
+    "num_workers":  1,              # the number of transcriptions which can run at the same time. raises throughput when transcribing in parallel, but not the latency of a single transcription
+    "beam_size":    5,              # 1 is greedy decoding: the fastest, and slightly less accurate. larger beams are more accurate, but slower (roughly linearly on CPU)
+    "vad_filter":   False           # skip any non-speech audio (with silero VAD) before decoding. faster with long pauses or trailing silence, but can clip very short or quiet words
+}
+# the default settings on CPU-only machines: quantized int8 weights, and greedy decoding
+WHISPER_CPU_SETTINGS = {**WHISPER_SETTINGS, "device": "cpu", "compute_type": "int8", "beam_size": 1}
+
+#-------------
+
+class Transcription(str):
+    def __new__(cls, text:str, words:list=None):
+        return super().__new__(cls, text)
+
+    def __init__(self, text:str, words:list=None):
+        """
+        The text of a transcription, which can be used anywhere that a plain string of the text can, along with 
+        the confidence of each of its words (if the transcriber provides them).
+
+        - `words` - a list of (word, confidence from 0 to 1) tuples, including any unknown words (`UNKNOWN_WORD`), or None if not provided
+        """
+        self.words = words
+
+    @property
+    def confidence(self) -> float|None:
+        """The lowest confidence of any of the words (0 if any are unknown words), or None if the word confidences weren't provided"""
+        if self.words is None:
+            return None
+        return min((0.0 if word == UNKNOWN_WORD else conf for word, conf in self.words), default=0.0)
+
+    @staticmethod
+    def join(transcriptions:list) -> "Transcription":
+        """Combine the text and words of multiple transcriptions (in order) into one"""
+        words = [transcription.words for transcription in transcriptions]
+        return Transcription(" ".join(t for t in transcriptions if t), None if None in words else [w for ws in words for w in ws])
+
 #-------------
 
 class _WhisperT:
-    def __init__(self):
-        model_path = "tiny.en"                                  # choice between "tiny", "base", "small", "medium", "large"
-        self.model = WhisperModel(model_path)
+    def __init__(self, settings:dict=None):
+        """`settings` can override any of the default settings: `WHISPER_SETTINGS` if there's a CUDA GPU, 
+        otherwise `WHISPER_CPU_SETTINGS` (see `WHISPER_SETTINGS` for what each one does)"""
+        from faster_whisper import WhisperModel
+        from ctranslate2 import get_cuda_device_count             # (installed with faster-whisper, which runs on it)
+        default_settings = WHISPER_SETTINGS if get_cuda_device_count() else WHISPER_CPU_SETTINGS
+        self.settings = {**default_settings, **(settings or {})}
+        assert set(self.settings) == set(WHISPER_SETTINGS), f"Invalid whisper settings: {set(self.settings) - set(WHISPER_SETTINGS)}"
+        self.model = WhisperModel(
+            self.settings["model_size"], 
+            device=self.settings["device"], 
+            compute_type=self.settings["compute_type"], 
+            cpu_threads=self.settings["cpu_threads"], 
+            num_workers=self.settings["num_workers"]
+        )
         self.no_speech_prob_threshold = 0.1                     # the lower the float, the more strict the transcription quality filtering will be
 
     def transcribe(self, audio_data):
         """transcribe!"""
-        audio_data = np.frombuffer(audio_data, np.int16).flatten().astype(np.float32) / 32768.0     # convert audio data into format that transcriber can use
-        segments, info = self.model.transcribe(audio_data, language="en")                           # transcribe audio
+        import numpy as np
+        audio = np.frombuffer(audio_data, np.int16).astype(np.float32)     # convert audio data into format that transcriber can use (with a single copy),
+        audio *= 1 / 32768.0                                                # and scale it in place
+        segments, info = self.model.transcribe(audio, language="en", beam_size=self.settings["beam_size"], vad_filter=self.settings["vad_filter"])    # transcribe audio
         text = ""
         for seg in segments:                                    # combine the text of each segment together, so long as its no-speech-probability is below the threshold
             seg = seg._asdict()
             if seg['no_speech_prob'] < self.no_speech_prob_threshold:
                 text += seg['text'].strip() + " "
-        return text.strip()
+        return Transcription(text.strip())
+
+def get_vosk_grammar(words_to_recognize:str) -> str:
+    """Get the vosk grammar string for a string of words separated by whitespace (each word is only included once)"""
+    words = " ".join(dict.fromkeys(words_to_recognize.split()))
+    return f'["{words}", "[unk]"]'
 
 class _VoskT:
-    def __init__(self):
+    def __init__(self, max_grammars:int=16):
+        """
+        Recognizers are kept in a pool, keyed by their vocabulary (grammar), so that recently used grammars don't have to be 
+        compiled again, and so that each recognizer is only used by one thread at a time (ex: the wakeword checker and the main loop).
+        Up to `max_grammars` of the most recently used grammars are kept.
+        """
+        from vosk import Model, SetLogLevel
         model_path = path.join(path.dirname(__file__), "vosk_models", "vosk-model-small-en-us-0.15")
         SetLogLevel(-1)                                         # disables kaldi output messages
         self.model = Model(model_path = model_path, lang='en-us')
-        self.reset()
+        self.max_grammars = max_grammars
+        self._pool = OrderedDict()                              # words to recognize (or None for full vocabulary) -> list of idle recognizers, from least to most recently used
+        self._pool_lock = Lock()
+        self.pool_stats = {"hits": 0, "misses": 0}
 
-    def reset(self):
-        """Reset transcriber back to using full vocabulary, and reset word times for transcription"""
-        self.recognizer = KaldiRecognizer(self.model, 16000)    # spawn a new recognizer to reset vocabulary  
-        self.recognizer.SetWords(True)                          # set this to true to have results come with time and confidence
+    def _new_recognizer(self, words_to_recognize:str=None):
+        from vosk import KaldiRecognizer
+        if words_to_recognize:
+            recognizer = KaldiRecognizer(self.model, 16000, get_vosk_grammar(words_to_recognize))  # (the grammar is only compiled here, once per recognizer)
+        else:
+            recognizer = KaldiRecognizer(self.model, 16000)
+        recognizer.SetWords(True)                               # set this to true to have results come with time and confidence
+        return recognizer
+
+    def _acquire(self, words_to_recognize:str=None):
+        """Take an idle recognizer for the vocabulary out of the pool (or create a new one if there isn't any)"""
+        with self._pool_lock:
+            idle = self._pool.get(words_to_recognize)
+            if idle:
+                self._pool.move_to_end(words_to_recognize)
+                self.pool_stats["hits"] += 1
+                return idle.pop()
+            self.pool_stats["misses"] += 1
+        return self._new_recognizer(words_to_recognize)
+
+    def _release(self, words_to_recognize:str, recognizer):
+        """Reset a recognizer and put it back into the pool, discarding the recognizers of the least recently used grammars if it's full"""
+        recognizer.Reset()
+        with self._pool_lock:
+            self._pool.setdefault(words_to_recognize, []).append(recognizer)
+            self._pool.move_to_end(words_to_recognize)
+            while len(self._pool) > self.max_grammars:
+                self._pool.popitem(last=False)
+
+    @staticmethod
+    def get_result_text(dict_result:dict) -> Transcription:
+        """Extract the text of a recognizer result, along with the confidence of each word"""
+        text = dict_result.get('text', '')
+        text = text.replace(UNKNOWN_WORD, '')                   # this makes sure to remove "[unk]" from text
+        words = [(word['word'], word['conf']) for word in dict_result.get('result', [])]
+        return Transcription(" ".join(text.split()), words)
 
     def transcribe(self, audio_data, words_to_recognize:str=None, get_metadata:bool=False) -> str|tuple[str,dict]:
         """`words_to_recognize` must be a single string, with the words separated by whitespace"""
         # transcribe audio
-        if words_to_recognize:
-            words = f'["{words_to_recognize}", "[unk]"]'
-            self.recognizer.SetGrammar(words)
-        self.recognizer.AcceptWaveform(audio_data)
-        json_result = self.recognizer.Result()
+        recognizer = self._acquire(words_to_recognize or None)
+        try:
+            recognizer.AcceptWaveform(audio_data)
+            json_result = recognizer.Result()
+        finally:
+            self._release(words_to_recognize or None, recognizer)
         # extract text of transcription
         dict_result = json.loads(json_result)
-        text = dict_result.get('text')
-        text = text.replace('[unk]', '')                        # this makes sure to remove "[unk]" from text
-        text = text.strip()
+        text = self.get_result_text(dict_result)
 
         if get_metadata:
             return text, dict_result
@@ -59,8 +167,23 @@ class _VoskT:
 # main classes
 
 class SpeechProcessor:
-    def __init__(self):
-        """The class for capturing voice phrases and transcribing them into text"""
+    def __init__(self, preload:bool=True, streaming:bool=False, whisper_settings:dict=None):
+        """The class for capturing voice phrases and transcribing them into text.
+
+        The transcriber models are never loaded in here, as they can take a long time to load. If `preload` is True, 
+        they both start loading right away on background threads (see `load_model()`), otherwise each one is only 
+        loaded once it's first needed. Transcribing only waits for the model that it actually uses to be ready.
+
+        If `streaming` is True, then each phrase is decoded by vosk while it's still being captured, using the vocabulary 
+        set with `set_stream_vocabulary()`. Transcribing a captured phrase with that same vocabulary then only has to wait 
+        for the end of the decoding, instead of decoding the whole phrase from the start.
+
+        `whisper_settings` (optional) can override any of the full vocabulary transcriber's default settings 
+        (`WHISPER_SETTINGS`, or `WHISPER_CPU_SETTINGS` on CPU-only machines).
+
+        The most recent transcriptions are cached by their audio, transcriber, and vocabulary (see `transcribe()`)."""
+        self.startup_times = {}                                 # component name -> seconds taken to initialize/load it
+        start_time = perf_counter()
         #-- Audio Recorder and Audio Paramters --#
         self._rec = RecAudio()
         self._sample_rate = 16000
@@ -74,13 +197,85 @@ class SpeechProcessor:
         self._minimum_phrase_length = 0.3                       # in seconds
         self._phrase_chunks = []                                # holds the recorded audio data chunks which are above the threshold
         self._audio_q = Queue()                                 # holds audio data for phrases, ready for transcription
+        self.startup_times["recorder"] = perf_counter() - start_time
         #-- Transcribers --#
-        self._limited_vocab_transcriber = _VoskT()              # the limited vocabulary transcriber
-        self._full_vocab_transcriber = _WhisperT()              # the full vocabulary transcriber
+        self._model_classes = {
+            "vosk":     _VoskT,                                 # the limited vocabulary transcriber
+            "whisper":  partial(_WhisperT, whisper_settings)    # the full vocabulary transcriber
+        }
+        self._model_futures = {}                                # model name -> future of the loaded transcriber
+        self._model_lock = Lock()                               # (also guards `startup_times` of the models, so each one is reported to `_model_loaded_callback` once)
+        self._model_loaded_callback = None                      # called with (model name, seconds taken to load it) once each model is loaded
+        if preload:
+            for name in self._model_classes:
+                self.load_model(name)
+        #-- Streaming Decoding --#
+        self.streaming = streaming
+        self._stream_vocabulary = ''                            # the vocabulary to decode phrases with while they're being captured
+        self._stream_q = Queue()                                # holds phrase events for the stream decoder: ("start", (phrase id, vocabulary)), ("chunk", audio), ("end", future), or ("cancel", None)
+        self._streaming_phrase = False                          # whether or not the phrase currently being captured is being decoded
+        self._phrase_id = 0                                     # the id of the last phrase which was decoded while captured
+        self._partial_callback = None                           # called with (phrase id, partial transcription) whenever the partial transcription changes
+        self._discarded = set()                                 # the ids of phrases which shouldn't be queued or gotten (see `discard_phrase()`)
+        self._streamed = OrderedDict()                          # phrase audio data -> (vocabulary, future of its transcription, phrase id), for the most recent phrases
+        self._max_streamed = 8
+        self.stream_result_timeout = 5.0                        # the max seconds to wait for the end of a phrase's decoding, before just transcribing it normally
+        self._streamed_lock = Lock()
+        if streaming:
+            Thread(target=self._decode_stream, daemon=True).start()
+        #-- Transcription Cache --#
+        self.max_cached_transcriptions = 32
+        self._transcription_cache = OrderedDict()               # (audio digest, transcriber name, vocabulary) -> transcription, from least to most recently used
+        self._cache_lock = Lock()
+        self.cache_stats = {"hits": 0, "misses": 0}
+
+    #----- Transcriber Model Loading Methods -----#
+
+    def _load_model(self, name:str, future:Future):
+        start_time = perf_counter()
+        try:
+            transcriber = self._model_classes[name]()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        with self._model_lock:
+            self.startup_times[name] = perf_counter() - start_time
+            callback = self._model_loaded_callback
+        future.set_result(transcriber)
+        if callback:
+            callback(name, self.startup_times[name])
+
+    def load_model(self, name:str) -> Future:
+        """Start loading a transcriber model ("vosk" or "whisper") on a background thread, if it isn't already loaded or loading.
+        Returns a future which is done once the model is ready (call `.result()` on it to wait for it)"""
+        with self._model_lock:
+            if name not in self._model_futures:
+                self._model_futures[name] = Future()
+                Thread(target=self._load_model, args=(name, self._model_futures[name]), daemon=True).start()
+            return self._model_futures[name]
+
+    def set_model_loaded_callback(self, func):
+        """Set a function to be called with (model name, seconds taken to load it) once each transcriber model is loaded 
+        (on its loading thread). It's called right away for any models which are already loaded"""
+        with self._model_lock:
+            self._model_loaded_callback = func
+            loaded = {name: self.startup_times[name] for name in self._model_classes if name in self.startup_times}
+        for name, seconds in loaded.items():
+            func(name, seconds)
+
+    def is_model_ready(self, name:str) -> bool:
+        """return `True` if a transcriber model has been loaded, otherwise return `False`"""
+        future = self._model_futures.get(name)
+        return bool(future and future.done() and not future.exception())
+
+    def _get_transcriber(self, name:str) -> _VoskT|_WhisperT:
+        """Get a transcriber, blocking until its model is loaded (raises any error that occurred while loading it)"""
+        return self.load_model(name).result()
 
     #----- Phrase Capture Support Methods -----#
 
     def __get_audio_power(self, data):
+        import numpy as np
         data_array = np.frombuffer(data, dtype="int16")
         sample_value_range = abs(int(np.max(data_array)) - int(np.min(data_array)))
         # mean_sample_value = mean(abs(audio_data_array))
@@ -91,17 +286,146 @@ class SpeechProcessor:
         minimum_chunks = round(self._minimum_phrase_length * self._chunks_per_second)
 
         if audio_power > self._audio_threshold:
+            if not self._phrase_chunks:
+                self._start_stream_phrase()
             self._phrase_chunks.append(chunk)
+            if self._streaming_phrase:
+                self._stream_q.put(("chunk", chunk))
         
         elif audio_power < self._audio_threshold and self._phrase_chunks:
-            if len(self._phrase_chunks) >= minimum_chunks:
+            if self._streaming_phrase and self._phrase_id in self._discarded:
+                self._discarded.discard(self._phrase_id)        # (the phrase was already handled while it was captured, so it's not queued)
+                self._stream_q.put(("cancel", None))
+            elif len(self._phrase_chunks) >= minimum_chunks:
                 self._phrase_chunks.append(chunk)
                 phrase_audio_data = b''.join(self._phrase_chunks)
+                self._end_stream_phrase(chunk, phrase_audio_data)
                 # put audio into queue
                 self._audio_q.put(phrase_audio_data)
+            elif self._streaming_phrase:
+                self._stream_q.put(("cancel", None))
 
             # regardless of above condition, clear phrase_chunks
             self._phrase_chunks.clear()
+            self._streaming_phrase = False
+
+    #----- Streaming Decoding Methods -----#
+
+    def _start_stream_phrase(self):
+        """Start decoding a new phrase while it's captured (only if streaming, there's a stream vocabulary, and vosk is loaded)"""
+        vocabulary = self._stream_vocabulary
+        self._streaming_phrase = bool(self.streaming and vocabulary and self.is_model_ready("vosk"))
+        if self._streaming_phrase:
+            self._phrase_id += 1
+            self._stream_q.put(("start", (self._phrase_id, vocabulary)))
+
+    def _end_stream_phrase(self, last_chunk:bytes, phrase_audio_data:bytes):
+        """Decode the last chunk of a phrase, and store the future of its transcription (before the phrase is queued, so it can always be found)"""
+        if not self._streaming_phrase:
+            return
+        future = Future()
+        with self._streamed_lock:
+            self._streamed[phrase_audio_data] = (self._stream_vocabulary, future, self._phrase_id)
+            while len(self._streamed) > self._max_streamed:
+                self._streamed.popitem(last=False)
+        self._stream_q.put(("chunk", last_chunk))
+        self._stream_q.put(("end", future))
+
+    def _decode_stream(self):
+        """Feed the chunks of each phrase into a vosk recognizer as they're captured (runs on its own thread)"""
+        transcriber, recognizer, phrase_id, vocabulary, texts, error = None, None, 0, '', [], None
+        last_partial_text = ''                                  # the last partial transcription of the phrase being decoded (only used by this thread)
+        while True:
+            event, data = self._stream_q.get()
+            if event == "start":
+                if recognizer is not None:
+                    transcriber._release(vocabulary, recognizer)    # (if the last phrase was never ended, just discard it)
+                (phrase_id, vocabulary), texts, error = data, [], None
+                recognizer = None
+                last_partial_text = ''
+                try:
+                    transcriber = self._get_transcriber("vosk")
+                    recognizer = transcriber._acquire(vocabulary)
+                except Exception as e:
+                    error = e                                   # (the phrase will just be transcribed normally once it's captured)
+            elif recognizer is None:
+                if event == "end":
+                    data.set_exception(error or RuntimeError("the phrase was not decoded"))     # (so that nothing waits for it)
+                continue
+            elif event == "chunk":
+                try:
+                    if recognizer.AcceptWaveform(data):         # (returns True when vosk detects the end of an utterance within the phrase)
+                        texts.append(transcriber.get_result_text(json.loads(recognizer.Result())))
+                        partial = ''
+                    else:
+                        partial = json.loads(recognizer.PartialResult()).get('partial', '')
+                        partial = " ".join(partial.replace(UNKNOWN_WORD, '').split())   # (the same as `get_result_text()`)
+                except Exception as e:
+                    error = e
+                    continue
+                partial_text = ' '.join(text for text in texts + [partial] if text)
+                if partial_text != last_partial_text:
+                    last_partial_text = partial_text
+                    if self._partial_callback and partial_text:
+                        try:
+                            self._partial_callback(phrase_id, partial_text)
+                        except Exception:
+                            print_exc()                         # (don't let a failed callback take down the decoder)
+            elif event in ("end", "cancel"):
+                try:
+                    if event == "end" and not error:
+                        texts.append(transcriber.get_result_text(json.loads(recognizer.FinalResult())))
+                        data.set_result(Transcription.join(texts))
+                    elif event == "end":
+                        data.set_exception(error)
+                except Exception as e:
+                    data.set_exception(e)
+                finally:
+                    transcriber._release(vocabulary, recognizer)
+                    recognizer = None
+                    last_partial_text = ''
+
+    def set_stream_vocabulary(self, vocabulary:str=''):
+        """Set the vocabulary to decode phrases with while they're being captured (a single string, with the words separated by whitespace).
+        Phrases are only decoded while captured if this is set (and if `streaming` is True)"""
+        self._stream_vocabulary = vocabulary or ''
+
+    def set_partial_callback(self, func):
+        """Set a function to be called with the id and the partial transcription of a phrase, whenever its partial transcription changes
+        while it's being captured (only if the phrase is being decoded while captured). It's called from the stream decoder thread"""
+        self._partial_callback = func
+
+    def discard_phrase(self, phrase_id:int):
+        """Discard a phrase which was decoded while captured (ex: if its partial transcription was already used as input), 
+        so that it won't be queued, or if it was already queued, so that it's skipped by `get_phrase()`"""
+        with self._streamed_lock:
+            self._discarded.add(phrase_id)
+
+    def get_phrase_id(self, audio_data:bytes) -> int|None:
+        """Get the id of a phrase which was decoded while captured (the same id as its partial transcriptions), or None if it wasn't"""
+        with self._streamed_lock:
+            streamed = self._streamed.get(audio_data)
+        return streamed[2] if streamed else None
+
+    def _is_discarded(self, audio_data:bytes) -> bool:
+        with self._streamed_lock:
+            streamed = self._streamed.get(audio_data)
+            if streamed and streamed[2] in self._discarded:
+                self._discarded.discard(streamed[2])
+                return True
+        return False
+
+    def _get_streamed_transcript(self, audio_data:bytes, vocabulary:str) -> str|None:
+        """Get the transcription of a phrase which was decoded while it was captured with the same vocabulary (waits up to 
+        `stream_result_timeout` seconds for it to finish). Returns None if there isn't one, or if it didn't finish in time"""
+        with self._streamed_lock:
+            streamed = self._streamed.get(audio_data)
+        if not streamed or streamed[0] != vocabulary:
+            return None
+        try:
+            return streamed[1].result(timeout=self.stream_result_timeout)
+        except Exception:
+            return None                                         # (if decoding failed or timed out, it will just be transcribed normally)
 
     #----- Phrase Capture Accessible Methods -----#
 
@@ -124,12 +448,20 @@ class SpeechProcessor:
 
     #----- Phrase Getting and Editing Methods -----#    
 
-    def get_phrase(self, no_wait:bool=False) -> bytes:
-        """Get the oldest phrase in the queue"""
-        try:
-            return self._audio_q.get(block=not no_wait)
-        except:
-            return
+    def get_phrase(self, no_wait:bool=False, timeout:float=None) -> bytes:
+        """Get the oldest phrase in the queue. Unless `no_wait` is True, this will block until there is a phrase, 
+        `timeout` seconds have passed (if provided), or `wake_phrase_waiter()` is called (returns `None` for the last two)"""
+        while True:
+            try:
+                phrase = self._audio_q.get(block=not no_wait, timeout=timeout)
+            except:
+                return
+            if not (phrase and self._discarded and self._is_discarded(phrase)):
+                return phrase
+
+    def wake_phrase_waiter(self):
+        """Make any thread currently blocked in `get_phrase()` return `None`"""
+        self._audio_q.put(None)
 
     def get_phrase_length(self, phrase:bytes) -> float:
         """Get the length of a phrase in seconds"""
@@ -138,10 +470,32 @@ class SpeechProcessor:
     
     #----- Phrase Transcription Methods -----#
 
-    def transcribe(self, audio_data:bytes, vocabulary:str='') -> str:
-        """Transcribe phrase audio data into text.
-        `vocabulary` must be a single string, with the words separated by whitespace.
-        If vocabulary is not provided, then the transcriber will use entire language vocabulary, which will take longer"""
+    def _transcribe(self, audio_data:bytes, vocabulary:str) -> Transcription:
         if vocabulary:
-            return self._limited_vocab_transcriber.transcribe(audio_data, vocabulary)
-        return self._full_vocab_transcriber.transcribe(audio_data)
+            text = self._get_streamed_transcript(audio_data, vocabulary) if self._streamed else None
+            if text is not None:
+                return text
+            return self._get_transcriber("vosk").transcribe(audio_data, vocabulary)
+        return self._get_transcriber("whisper").transcribe(audio_data)
+
+    def transcribe(self, audio_data:bytes, vocabulary:str='') -> Transcription:
+        """Transcribe phrase audio data into text (a `Transcription`, with the confidence of each word if vosk was used).
+        `vocabulary` must be a single string, with the words separated by whitespace.
+        If vocabulary is not provided, then the transcriber will use entire language vocabulary, which will take longer.
+
+        The same audio is often transcribed more than once with the same vocabulary (ex: the wakeword check and the main loop), 
+        so the last `max_cached_transcriptions` are cached, and transcribing any of them again returns right away"""
+        key = (blake2b(audio_data, digest_size=16).digest(), "vosk" if vocabulary else "whisper", vocabulary or '')
+        with self._cache_lock:
+            text = self._transcription_cache.get(key)
+            if text is not None:
+                self._transcription_cache.move_to_end(key)
+                self.cache_stats["hits"] += 1
+                return text
+            self.cache_stats["misses"] += 1
+        text = self._transcribe(audio_data, vocabulary)
+        with self._cache_lock:
+            self._transcription_cache[key] = text
+            while len(self._transcription_cache) > self.max_cached_transcriptions:
+                self._transcription_cache.popitem(last=False)
+        return text
@@ -0,0 +1,136 @@
+from threading import Thread, Condition, RLock
+from collections import deque
+from time import monotonic
+from traceback import print_exc
+
+#------
+
+class ActionExecutor:
+    def __init__(self, max_workers:int=8, max_queue:int=64, on_action_done=None):
+        """
+        Runs command actions on a bounded pool of worker threads, instead of a new thread per action.
+
+        - `max_workers` - the max number of actions which can run at the same time (worker threads are only started when needed)
+        - `max_queue` - the max number of actions which can wait to be run. Any actions submitted beyond this are rejected
+        - `on_action_done` (optional) - a function (which takes no arguments) to call after every action is done running
+
+        Each command can also be limited with its `(max_concurrent, when_busy)` execution settings (see `submit()`).
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._on_action_done = on_action_done
+        lock = RLock()
+        self._cond = Condition(lock)            # guards everything below, and is notified whenever there's an action ready to run
+        self._space = Condition(lock)           # notified whenever an action is taken out of the queue (for `submit(wait=True)`)
+        self._ready = deque()                   # actions ready to run as soon as a worker is available: (name, func, args, submit time)
+        self._waiting = {}                      # command name -> deque of actions waiting for one of the command's own running actions to finish
+        self._running = {}                      # command name -> number of its actions which are ready or running
+        self._n_workers = 0
+        self._n_idle_workers = 0
+        self._active = True
+        #-- Metrics --#
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._command_stats = {}                # command name -> {"runs", "total_run_time", "max_run_time", "total_wait_time", "rejected"}
+
+    #-------- Internal Methods --------#
+
+    def _get_command_stats(self, name:str) -> dict:
+        return self._command_stats.setdefault(name, {"runs": 0, "total_run_time": 0.0, "max_run_time": 0.0, "total_wait_time": 0.0, "rejected": 0})
+
+    def _queue_depth(self) -> int:
+        return len(self._ready) + sum(len(q) for q in self._waiting.values())
+
+    def _reject(self, name:str) -> bool:
+        self._counters["rejected"] += 1
+        self._get_command_stats(name)["rejected"] += 1
+        return False
+
+    def _make_ready(self, job:tuple):
+        """Move an action into the ready queue, and make sure there's a worker to run it (must hold `_cond`)"""
+        self._running[job[0]] = self._running.get(job[0], 0) + 1
+        self._ready.append(job)
+        if len(self._ready) > self._n_idle_workers and self._n_workers < self.max_workers:
+            self._n_workers += 1
+            Thread(target=self._worker, daemon=True).start()
+        self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._n_idle_workers += 1
+                while self._active and not self._ready:
+                    self._cond.wait()
+                self._n_idle_workers -= 1
+                if not self._active:
+                    self._n_workers -= 1
+                    return
+                name, func, args, submit_time = self._ready.popleft()
+                self._space.notify()
+            start_time = monotonic()
+            failed = False
+            try:
+                func(*args)
+            except:
+                failed = True
+                print_exc()                     # (don't let a failed action take down the worker)
+            run_time = monotonic() - start_time
+            with self._cond:
+                self._counters["failed" if failed else "completed"] += 1
+                stats = self._get_command_stats(name)
+                stats["runs"] += 1
+                stats["total_run_time"] += run_time
+                stats["max_run_time"] = max(stats["max_run_time"], run_time)
+                stats["total_wait_time"] += start_time - submit_time
+                self._running[name] -= 1
+                waiting = self._waiting.get(name)
+                if waiting:
+                    self._make_ready(waiting.popleft())     # the command has a free slot now, so its next waiting action can run
+            if self._on_action_done:
+                self._on_action_done()
+
+    #-------- Accessible Methods --------#
+
+    def submit(self, name:str, func, args:tuple=(), settings:tuple=(None, "queue"), wait:bool=False) -> bool:
+        """Submit a command's action function to be run with `args`. `settings` are the command's execution settings:
+        - `max_concurrent` - the max number of this command's actions which can be running at the same time (`None` for no limit)
+        - `when_busy` - if `max_concurrent` are already running, either "queue" this action to run once one is done, or "drop" it
+
+        If `wait` is True and the queue is full, this blocks until there's room in it, instead of rejecting the action 
+        (so it must never be called with `wait` from within an action, as that could block all workers).
+
+        Returns `True` if the action will be run, and `False` if it was rejected (dropped, the queue is full, or the executor is shut down)"""
+        max_concurrent, when_busy = settings
+        with self._cond:
+            self._counters["submitted"] += 1
+            while wait and self._active and self._queue_depth() >= self.max_queue:
+                self._space.wait()
+            job = (name, func, args, monotonic())
+            if not self._active or self._queue_depth() >= self.max_queue:
+                return self._reject(name)
+            if max_concurrent and self._running.get(name, 0) >= max_concurrent:
+                if when_busy == "drop":
+                    return self._reject(name)
+                self._waiting.setdefault(name, deque()).append(job)
+            else:
+                self._make_ready(job)
+        return True
+
+    def get_stats(self) -> dict:
+        """Get a snapshot of the executor's counters and the run time stats of each command"""
+        with self._cond:
+            return {
+                **self._counters,
+                "queue_depth": self._queue_depth(),
+                "running": sum(self._running.values()) - len(self._ready),
+                "workers": self._n_workers,
+                "commands": {name: stats.copy() for name, stats in self._command_stats.items()}
+            }
+
+    def shutdown(self):
+        """Stop all workers once their current actions are done. Any actions still waiting are discarded"""
+        with self._cond:
+            self._active = False
+            self._ready.clear()
+            self._waiting.clear()
+            self._cond.notify_all()
+            self._space.notify_all()
@@ -0,0 +1,91 @@
+import pickle
+import hashlib
+import mmap
+from os import replace, remove, getpid
+from . import command_data_loader as com_loader, command_processing as com_proc
+from .misc_tools import gc_paused
+
+#------
+
+_CACHE_VERSION = b"2"                                   # change this whenever the cached data's structure changes, so that older caches aren't used
+_MAGIC = b"COMMAND-CACHE"
+_HEADER_SIZE = len(_MAGIC) + hashlib.sha256().digest_size   # each cache file starts with the magic bytes and then the cache key
+
+#-------- Cache Key and Index Functions --------#
+
+def get_cache_path(commands_path:str) -> str:
+    """Get the path of the cache file of a command file (it's kept right next to it)"""
+    return commands_path + ".cache"
+
+def get_cache_key(commands_path:str, func_map:dict) -> bytes:
+    """Get a hash of the command file's contents and of the function names in `func_map`. 
+    A cache can only be used if its key matches, as any change to either could change the loaded commands"""
+    key = hashlib.sha256(_CACHE_VERSION)
+    with open(commands_path, 'rb') as coms:
+        key.update(coms.read())
+    key.update('\0'.join(sorted(func_map)).encode())
+    return key.digest()
+
+def get_command_indices(commands:dict) -> dict:
+    """Generate all of the command vocab indices which the App uses (works with both bound and unbound commands)"""
+    vocab_to_com, com_to_unique_vocab, com_to_all_vocab = com_proc.build_input_vocab_indices(commands)
+    return {
+        "vocab_to_com":         vocab_to_com,
+        "com_to_unique_vocab":  com_to_unique_vocab,
+        "com_to_all_vocab":     com_to_all_vocab
+    }
+
+#-------- Cache File Functions --------#
+
+def _read_cache(cache_path:str, key:bytes) -> tuple|None:
+    """Get the (unbound commands, indices) stored in a cache file, if its key matches. The file is memory-mapped and 
+    unpickled straight from the mapping (without reading it all into memory first). Returns None if the cache can't be used"""
+    try:
+        with open(cache_path, 'rb') as cache, mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:_HEADER_SIZE] != _MAGIC + key:
+                return None
+            with memoryview(mapped)[_HEADER_SIZE:] as data:
+                return pickle.loads(data)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):    # (no cache file, an empty one, or a corrupted one)
+        return None
+
+def _write_cache(cache_path:str, key:bytes, cached:tuple):
+    """Write (unbound commands, indices) to a cache file. The file is replaced all at once, so that it's never read half-written.
+    The cache is only an optimization, so if it can't be written (ex: no write permission), nothing happens"""
+    temp_path = f"{cache_path}.{getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as cache:
+            cache.write(_MAGIC + key)
+            pickle.dump(cached, cache, protocol=pickle.HIGHEST_PROTOCOL)
+        replace(temp_path, cache_path)
+    except OSError:
+        try:
+            remove(temp_path)
+        except OSError:
+            pass
+
+#-------- Main Accessible Function --------#
+
+def load_cached_commands(commands_path:str, func_map:dict, use_cache:bool=False) -> tuple[dict, dict, dict]:
+    """Same as `command_data_loader.load_commands()`, but returns a tuple of the (bound) commands, the unbound commands
+    (see `command_data_loader.load_unbound_commands()`), and the command indices (see `get_command_indices()`).
+    
+    The converted commands and their indices are stored in a cache file next to the command file, so that on later loads, 
+    none of the command data has to be parsed, converted, or indexed again (only the functions are re-bound by name).
+    The cache is rebuilt whenever the command file or the function names in `func_map` have changed.
+    If `use_cache` is False (the default), the cache file is neither read nor written. As the cache file is unpickled, anyone 
+    who can write to the command file's directory could make loading it run any code, so only use the cache if no one else can."""
+    with gc_paused():                                   # (loading creates a lot of objects but no garbage)
+        cached = None
+        if use_cache:                                   # (the command file is only hashed if the cache is used)
+            key = get_cache_key(commands_path, func_map)
+            cache_path = get_cache_path(commands_path)
+            cached = _read_cache(cache_path, key)
+        if cached:
+            unbound_commands, indices = cached
+        else:
+            unbound_commands = com_loader.load_unbound_commands(commands_path, func_map)
+            indices = get_command_indices(unbound_commands)
+            if use_cache:
+                _write_cache(cache_path, key, (unbound_commands, indices))
+        return com_loader.bind_commands(unbound_commands, func_map), unbound_commands, indices
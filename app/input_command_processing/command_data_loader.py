@@ -1,5 +1,5 @@
 import json
-from .command_processing import REQ_TYPES
+from .command_processing import REQ_TYPES, PREQ_CACHE_ON_CHANGE
 from .input_string_processing import _get_number_from_string
 from .misc_tools import is_numbers
 
@@ -20,6 +20,14 @@ _ORDERED = '<ORD>'
 # special reference symbols
 _INPUT_INDEX = "^I"
 _ACTION_INDEX = "^A"
+# compiled action arg sources
+_CONSTANT_ARG = 0
+_INPUT_ARG = 1
+_ACTION_ARG = 2
+# pre requirement cache symbols
+_ON_CHANGE = "on_change"
+# action execution symbols
+_WHEN_BUSY_OPTIONS = ("queue", "drop")
 
 
 #-------- Supporting Conversion Functions --------#
@@ -46,8 +54,9 @@ def _get_input_req_val_number_range(req_value:str, og_req) -> tuple:
         assert is_numbers(range), error_msg
     return range
 
-def _get_func_ref(ref:str|list, func_map:dict) -> tuple:
-    """convert any function string reference (found in function-requirements or actions) to a tuple with the actual function reference and args"""
+def _get_func_name_ref(ref:str|list, func_map:dict) -> tuple:
+    """convert any function string reference (found in function-requirements or actions) to a tuple with the function name and args,
+    checking that the name refers to an actual function in `func_map`"""
     if isinstance(ref, str):                            # if the function reference is just a string, 
         name = ref                                      # then the string is the name of the function, 
         args = ()                                       # and there are no arguments to pass to it
@@ -58,21 +67,34 @@ def _get_func_ref(ref:str|list, func_map:dict) -> tuple:
     func_ref = func_map.get(name)                       # get actual internal function reference from name in func_map
     assert func_ref != None, f'no matching function found for "{name}" string reference'
     assert callable(func_ref), f'"{name}" is not callable'
-    return (func_ref, args)
+    return (name, args)
 
 
 #-------- Primary Conversion Functions for Each of the 2 Command Requirements Properties --------#
 
 # 1) convert single pre requirement
-def _convert_pre_req(freq:list, action_func_map:dict) -> tuple:
-    """convert a pre-requirement into a tuple: (func, (args), required_return_value)"""
+def _convert_pre_req(freq:list, action_func_map:dict, preq_cache:dict) -> tuple:
+    """convert a pre-requirement into a tuple: (func_name, (args), required_return_value, cache)"""
     # the first item must always be the function name ref, and the last item must be the return value to check
     # any items in between (optional) are args to pass to the function
     assert len(freq) >= 2, "All function requirements need 1 function and a return value to check"    
+    cache = preq_cache.get(freq[0])                     # how long the function's return value can be reused for (if specified)
     if len(freq) > 2:
-        return (_get_func_ref(freq[:-1], action_func_map)) + (freq[-1],)
+        return (_get_func_name_ref(freq[:-1], action_func_map)) + (freq[-1], cache)
     else:
-        return (_get_func_ref(freq[0], action_func_map)) + (freq[1],)
+        return (_get_func_name_ref(freq[0], action_func_map)) + (freq[1], cache)
+
+def _convert_preq_cache(preq_cache:dict) -> dict:
+    """convert the optional "preq_cache" object into a dict of function names to either a number of seconds 
+    that their return values can be reused for (time-to-live), or `PREQ_CACHE_ON_CHANGE` (reused until the app's state changes)"""
+    converted = {}
+    for name, cache in preq_cache.items():
+        if cache == _ON_CHANGE:
+            converted[name] = PREQ_CACHE_ON_CHANGE
+        else:
+            assert is_numbers(cache) and cache > 0, f'"{name}" pre requirement cache is invalid. It must be either a positive number of seconds, or "{_ON_CHANGE}"'
+            converted[name] = cache
+    return converted
 
 # 2) convert single input requirement
 def _convert_input_req(req, aliases:dict) -> tuple:
@@ -133,33 +155,70 @@ def _convert_input_req(req, aliases:dict) -> tuple:
 #-------- Action Function Generation Function --------#
 
 # 3) convert all actions
-def _generate_actions_func(actions:list):
-    """Generates and returns a function which executes all of the actions from the provided command action list"""
+def _get_reference_index(arg:str, prefix:str, n_available:int, com_name:str) -> int:
+    """Get the index number of an input-index or action-index reference arg, and check that it refers to an existing value"""
+    index = arg.removeprefix(prefix)
+    assert index.isdigit(), f"'{com_name}' command is invalid. \"{arg}\" must be \"{prefix}\" followed by an index number"
+    index = int(index)
+    assert index < n_available, f"'{com_name}' command is invalid. \"{arg}\" refers to a value which doesn't exist (there are only {n_available} values available to it)"
+    return index
+
+def _compile_action_args(args:tuple, n_input_reqs:int, action_i:int, com_name:str) -> tuple|None:
+    """Compile an action's args into a tuple of (source, value) pairs, where source is one of:
+    - `_CONSTANT_ARG`: the value is the arg itself
+    - `_INPUT_ARG`: the value is an index of the input requirement values
+    - `_ACTION_ARG`: the value is an index of the return values of the previous actions
+    
+    Returns `None` if none of the args are references, as then they can always be passed as is"""
+    plan = []
+    for arg in args:
+        if isinstance(arg, str) and arg.startswith(_INPUT_INDEX):       # if the string arg starts with the input-index symbol
+            plan.append((_INPUT_ARG, _get_reference_index(arg, _INPUT_INDEX, n_input_reqs, com_name)))
+        elif isinstance(arg, str) and arg.startswith(_ACTION_INDEX):    # if the string arg starts with the action-index symbol (can only refer to actions before this one)
+            plan.append((_ACTION_ARG, _get_reference_index(arg, _ACTION_INDEX, action_i, com_name)))
+        else:
+            plan.append((_CONSTANT_ARG, arg))
+    if all(source == _CONSTANT_ARG for source, value in plan):
+        return None
+    return tuple(plan)
+
+def _generate_actions_func(plan:list):
+    """Generates and returns a function which executes all of the actions from the provided command action plan: a list of 
+    (func, args, compiled args) tuples (see `_compile_action_args()`). All references to input requirement values and previous 
+    action return values were already resolved when the args were compiled, so calling the function only has to look up values by index."""
 
     def command_actions(input_req_values:list):
         return_values = []
-        for func, args in actions:
-            new_args = []
-            # update any args which are references to input requirements or previous function return values:
-            for arg in args:
-                if isinstance(arg, str):
-                    if arg.startswith(_INPUT_INDEX):            # if the string arg starts with the input-index symbol
-                        i = int(arg.removeprefix(_INPUT_INDEX)) # then extract the following number to use as an index,
-                        arg = input_req_values[i]               # and use input_req_values's value at index as the arg   
-                    elif arg.startswith(_ACTION_INDEX):         # if the string arg starts with the action-index symbol, 
-                        i = int(arg.removeprefix(_ACTION_INDEX))# then extract the following number to use as an index,
-                        arg = return_values[i]                  # and use return_values's value at index as the arg 
-                new_args.append(arg)
-            return_values.append(func(*new_args))               # call the function with the args and append the result to return values
+        sources = (None, input_req_values, return_values)     # indexed by `_INPUT_ARG` and `_ACTION_ARG`
+        for func, args, arg_plan in plan:
+            if arg_plan:                                        # update any args which are references to input requirements or previous function return values
+                args = [sources[source][value] if source else value for source, value in arg_plan]
+            return_values.append(func(*args))                   # call the function with the args and append the result to return values
 
     return command_actions
 
 
-#-------- Main Accessible Command Loader Function --------#
+#-------- Action Execution Settings Conversion Function --------#
 
-def load_commands(commands_path:str, func_map:dict) -> dict:
-    """Load json containing commands from `command_path`, check that their code is valid, 
-    and convert command data into internally usable list of commands."""
+# 4) convert action execution settings
+def _convert_exec_settings(exec_settings:dict, com_name:str) -> tuple:
+    """convert a command's optional execution settings into a tuple: (max_concurrent, when_busy)
+    - `max_concurrent` - the max number of this command's actions which can run at the same time (`None` for no limit, `1` to run them one at a time)
+    - `when_busy` - what to do with the action if `max_concurrent` are already running: "queue" it to run later, or "drop" it"""
+    assert isinstance(exec_settings, dict) and set(exec_settings) <= {"max_concurrent", "when_busy"}, f"'{com_name}' command is invalid. 'exec' must be an object with only the (optional) keys 'max_concurrent' and 'when_busy'"
+    max_concurrent = exec_settings.get("max_concurrent")
+    when_busy = exec_settings.get("when_busy", "queue")
+    assert max_concurrent is None or (isinstance(max_concurrent, int) and max_concurrent > 0), f"'{com_name}' command is invalid. 'max_concurrent' must be a positive integer"
+    assert when_busy in _WHEN_BUSY_OPTIONS, f"'{com_name}' command is invalid. 'when_busy' must be one of: {_WHEN_BUSY_OPTIONS}"
+    return (max_concurrent, when_busy)
+
+
+#-------- Main Accessible Command Loader Functions --------#
+
+def load_unbound_commands(commands_path:str, func_map:dict) -> dict:
+    """Load json containing commands from `command_path`, check that their code is valid, and convert command data into
+    a dict of commands which still refer to functions by their names in `func_map` (see `bind_commands()`).
+    Unlike bound commands, these only contain plain data, so they can be stored (see `command_cache`)."""
     # 1) load JSON file:
     with open(commands_path, 'r') as coms:
         data = json.load(coms)
@@ -168,27 +227,51 @@ def load_commands(commands_path:str, func_map:dict) -> dict:
     aliases = data.get("aliases")
     commands = data.get("commands")
     assert isinstance(aliases, dict) and isinstance(commands, dict), f"""the JSON file at '{commands_path}' has incorrect base structure. File must contain a JSON object, which itself contains 2 other objects called "aliases" and "commands"."""
+    preq_cache = data.get("preq_cache", {})             # (optional) how long each pre requirement function's return value can be reused for
+    assert isinstance(preq_cache, dict), f"""the JSON file at '{commands_path}' has an invalid "preq_cache". If provided, it must be an object of function names to cache durations."""
+    preq_cache = _convert_preq_cache(preq_cache)
     
     # 3) convert the command data:
     converted_commands = {}
     for com_name, com_data in commands.items():
         # check that each command dict has the correct structure and valid values:
-        assert isinstance(com_data, dict) and tuple(com_data) == ('preqs', 'input', 'actns'), f"'{com_name}' command is invalid. All commands must be an object with the keys 'preqs', 'input', and 'actns'"
-        assert all(isinstance(val, list) for val in com_data.values()), f"'{com_name}' command is invalid. Each command object's values must be arrays"
+        assert isinstance(com_data, dict) and tuple(com_data)[:3] == ('preqs', 'input', 'actns') and set(tuple(com_data)[3:]) <= {'exec'}, f"'{com_name}' command is invalid. All commands must be an object with the keys 'preqs', 'input', and 'actns' (and optionally 'exec')"
+        assert all(isinstance(com_data[key], list) for key in ('preqs', 'input', 'actns')), f"'{com_name}' command is invalid. Each command object's 'preqs', 'input', and 'actns' values must be arrays"
         assert len(com_data["preqs"]) > 0 or len(com_data["input"]) > 0, f"'{com_name}' command is invalid. Each command must have at least one pre-requirement or one input requirement. Can have multiple of both, but can't have neither"
         assert len(com_data["actns"]) > 0, f"'{com_name}' command is invalid. Each command must have at least one action"
         # convert command requirements into tuples with any references replaced with their corresponding values:
-        preqs = [_convert_pre_req(preq, func_map) for preq in com_data.get("preqs")]
+        preqs = [_convert_pre_req(preq, func_map, preq_cache) for preq in com_data.get("preqs")]
         input_reqs = [_convert_input_req(inp_req, aliases) for inp_req in com_data.get("input")]
-        # convert and combine all actions into a single function with any references replaced with their corresponding values:
-        action_func = _generate_actions_func([_get_func_ref(action, func_map) for action in com_data.get("actns")])
-        # add fully converted command to converted_commands:
+        actions = [_get_func_name_ref(action, func_map) for action in com_data.get("actns")]
+        actions = [(name, args, _compile_action_args(args, len(input_reqs), i, com_name)) for i, (name, args) in enumerate(actions)]
+        exec_settings = _convert_exec_settings(com_data.get("exec", {}), com_name)
+        # add converted command to converted_commands:
         converted_commands.update({
             com_name: {
                 'preqs': preqs, 
                 'input': input_reqs,
-                'action': action_func
+                'actions': actions,
+                'exec': exec_settings
             }
         })
 
     return converted_commands
+
+def bind_commands(unbound_commands:dict, func_map:dict) -> dict:
+    """Convert unbound commands (see `load_unbound_commands()`) into the internally usable dict of commands,
+    by replacing each function name with its function in `func_map`, and combining all actions into a single function"""
+    bound_commands = {}
+    for com_name, com_data in unbound_commands.items():
+        bound_commands[com_name] = {
+            'preqs': [(func_map[name], args, val, cache) for name, args, val, cache in com_data['preqs']],
+            'input': com_data['input'],
+            # combine all actions into a single function with any references replaced with their corresponding values:
+            'action': _generate_actions_func([(func_map[name], args, arg_plan) for name, args, arg_plan in com_data['actions']]),
+            'exec': com_data['exec']
+        }
+    return bound_commands
+
+def load_commands(commands_path:str, func_map:dict) -> dict:
+    """Load json containing commands from `command_path`, check that their code is valid, 
+    and convert command data into internally usable list of commands."""
+    return bind_commands(load_unbound_commands(commands_path, func_map), func_map)
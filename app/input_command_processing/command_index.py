@@ -0,0 +1,81 @@
+from .command_processing import get_command_vocab, get_command_unique_vocab, build_input_vocab_indices
+from .misc_tools import flatten_generator
+
+#------
+
+class CommandIndex:
+    def __init__(self, commands:dict, indices:dict=None):
+        """
+        The vocab-to-command, unique-vocab, and full-vocab indices of a dict of commands (bound or unbound), which can be kept up to date 
+        as commands are added, changed, and removed (see `update()`), by only updating the entries of the affected commands.
+        
+        If the `indices` of `commands` were already generated (see `command_cache.get_command_indices()`), pass them in to use them as is,
+        otherwise they're all generated together in a single pass (see `build_input_vocab_indices()`).
+
+        This is not thread safe, so only one thread should update it at a time, and any other threads should only use copies of its indices.
+        """
+        # - `commands`: command name -> command data
+        # - `vocab_to_com`: token -> list of the names of the commands which use it (once for each time they use it)
+        # - `com_to_unique_vocab`: command name -> vocab of its most unique input requirement
+        # - `com_to_all_vocab`: command name -> vocab of all of its input requirements
+        if indices:
+            self.vocab_to_com = {token: list(names) for token, names in indices["vocab_to_com"].items()}
+            self.com_to_unique_vocab = dict(indices["com_to_unique_vocab"])
+            self.com_to_all_vocab = dict(indices["com_to_all_vocab"])
+        else:
+            self.vocab_to_com, self.com_to_unique_vocab, self.com_to_all_vocab = build_input_vocab_indices(commands)
+        self.commands = dict(commands)
+        self._vocab_counts = {token: len(names) for token, names in self.vocab_to_com.items()}    # token -> number of times it's used across all commands
+
+    #-------- Internal Methods --------#
+
+    def _add(self, name:str, data:dict) -> set:
+        """Add a command's vocab to the vocab indices, and return the set of its tokens"""
+        tokens = get_command_vocab(data["input"])
+        for token in tokens:
+            self.vocab_to_com.setdefault(token, []).append(name)
+            self._vocab_counts[token] = self._vocab_counts.get(token, 0) + 1
+        self.com_to_all_vocab[name] = list(set(tokens))
+        return set(tokens)
+
+    def _remove(self, name:str) -> set:
+        """Remove a command from all of the indices, and return the set of its tokens"""
+        tokens = self.com_to_all_vocab.pop(name)
+        self.com_to_unique_vocab.pop(name, None)
+        for token in tokens:
+            names = [n for n in self.vocab_to_com[token] if n != name]
+            if names:
+                self.vocab_to_com[token] = names
+                self._vocab_counts[token] = len(names)
+            else:
+                del self.vocab_to_com[token]
+                del self._vocab_counts[token]
+        return set(tokens)
+
+    #-------- Accessible Methods --------#
+
+    def copy(self) -> "CommandIndex":
+        """Get a copy of the index, which can be updated without changing this one"""
+        return CommandIndex(self.commands, {"vocab_to_com": self.vocab_to_com, "com_to_unique_vocab": self.com_to_unique_vocab, "com_to_all_vocab": self.com_to_all_vocab})
+
+    def update(self, new_commands:dict) -> tuple[list, list, list]:
+        """Make the index match `new_commands`, only updating the entries of the commands which were added, changed, or removed, 
+        and the unique vocab of any other commands which share vocab with them (as how unique their vocab is may have changed).
+        Returns a tuple of the names of the (added, removed, changed) commands"""
+        added = [name for name in new_commands if name not in self.commands]
+        removed = [name for name in self.commands if name not in new_commands]
+        changed = [name for name, data in new_commands.items() if name in self.commands and data != self.commands[name]]
+        changed_tokens = set()
+        for name in removed + changed:
+            changed_tokens.update(self._remove(name))
+        for name in changed + added:
+            changed_tokens.update(self._add(name, new_commands[name]))
+        self.commands = dict(new_commands)                  # (in the same order as `new_commands`)
+        affected = set(changed + added).union(*(self.vocab_to_com.get(token, ()) for token in changed_tokens))
+        for name in affected:
+            self.com_to_unique_vocab[name] = get_command_unique_vocab(self.commands[name]["input"], self._vocab_counts)
+        return added, removed, changed
+
+    def get_unique_vocab_list(self) -> list:
+        """Get a list of the most unique vocab of all commands"""
+        return list(flatten_generator(self.com_to_unique_vocab.values()))
@@ -1,11 +1,15 @@
 from typing import Callable
+from collections import Counter
+from time import monotonic
 from . import input_string_processing as input_proc
-from .misc_tools import flatten_generator, is_numbers
+from .misc_tools import flatten_generator, is_numbers, gc_paused
 
 
 # input requirement type internal values:
 REQ_TYPES = ("STRING", "OPEN", "NUMBER", "TIME", "DURATION", "ANY", "ALL", "ORDERED")
 _OPEN_PLACEHOLDER = "~?OPEN?~"
+# pre requirement cache value for return values which are reused until the app's state changes:
+PREQ_CACHE_ON_CHANGE = "ON_CHANGE"
 
 
 #-------- Functions for Generating Command Input Requirement Indices --------#
@@ -24,70 +28,131 @@ def _get_input_req_vocab(input_req:tuple) -> list:
     elif req_type in ("ANY", "ALL", "ORDERED"):
         return [vocab for vocab in flatten_generator(_get_input_req_vocab(sub_req) for sub_req in req_val)]
 
-def _get_input_req_string_counts_and_vocab(input_req:tuple, vocab_counts:dict) -> int:
-    """Pass in an input requirement, and a dictionary containing each STRING-type word and the amount of 
-    times it appears across commands, and get the total count of that input requirement's STRING-type 
-    vocabulary along with the vocabulary itself. This means: 
+def _index_input_req(input_req:tuple, intern:Callable, req_tokens:list) -> tuple|None:
+    """Walk an input requirement once, appending the (interned) ids of all of its vocabulary / tokens to `req_tokens` 
+    (same as `_get_input_req_vocab()`), and return a plan for finding its most unique vocabulary (see `_get_plan_vocab_and_count()`).
+    `intern` must be a function which returns the id of a token. Returns None if the requirement has no STRING-type vocabulary"""
+    req_type, req_val, repl_val = input_req
+    if req_type == "STRING":
+        if req_val:
+            req_tokens.extend(intern(token) for token in req_val.split())
+            return ("STRING", intern(req_val))
+    elif req_type == "NUMBER":
+        req_tokens.extend(intern(token) for token in input_proc.FULL_NUMBER_VOCAB)
+    elif req_type == "DURATION":
+        req_tokens.extend(intern(token) for token in input_proc.FULL_NUMBER_VOCAB + list(input_proc.DURATION_WORD_MAP.keys()))
+    elif req_type in ("ANY", "ALL", "ORDERED"):
+        sub_plans = [_index_input_req(sub_req, intern, req_tokens) for sub_req in req_val]
+        return (req_type, sub_plans)
+    return None
+
+def _get_plan_vocab_and_count(plan:tuple|None, vocab_counts) -> tuple[list, int]:
+    """Pass in an input requirement's plan (see `_index_input_req()`), and the amount of times each token id appears across 
+    commands (a dict of token id -> count, where missing ids count as 0), and get the vocabulary (token ids) of the requirement's STRING-types, along with their total count. This means:
 
     - the count of the value/word if a STRING type
     - the total count of value/words of nested STRING-types if an ANY type containing only string types
-    - the total count of value/words of only nested STRING-types if an ALL/ORDERED.
+    - the count of the value/words of the least used nested STRING-type of an ALL/ORDERED.
     
-    Otherwise, if the requirement type doesn't correspond to the above, return 0"""
-    req_type, req_val, replacement = input_req
-    vocab = []
-    count = 0
+    Otherwise, if the requirement type doesn't correspond to the above, return an empty list and 0"""
+    if not plan:
+        return [], 0
+    req_type, value = plan
     if req_type == "STRING":
-        str_count = vocab_counts.get(req_val)
-        if str_count:                       # if req type is STRING, add it is within `vocab_counts`, append its value and add count 
-            vocab.append(req_val)
-            count += str_count
+        count = vocab_counts.get(value, 0)                  # (a multi-word STRING value is never a token itself, so it can be missing)
+        return ([value], count) if count else ([], 0)
     elif req_type == "ANY":
-        for sub_req in req_val:
-            sub_vocab, sub_count = _get_input_req_string_counts_and_vocab(sub_req, vocab_counts)
+        vocab = []
+        count = 0
+        for sub_plan in value:
+            sub_vocab, sub_count = _get_plan_vocab_and_count(sub_plan, vocab_counts)
             if not sub_count:
                 return [], 0                # if any of the `sub_counts` are 0 (meaning not STRING or not present in vocab_counts), then immediately return an empty list and 0 for the entire thing
-            else:
-                vocab.append(sub_vocab)
-                count += sub_count
-    elif req_type in ("ALL", "ORDERED"):
-        for sub_req in req_val:
-            sub_vocab, sub_count = _get_input_req_string_counts_and_vocab(sub_req, vocab_counts)
+            vocab += sub_vocab
+            count += sub_count
+        return vocab, count
+    else:                                   # ALL / ORDERED
+        candidates = []
+        count = 0
+        for sub_plan in value:
+            sub_vocab, sub_count = _get_plan_vocab_and_count(sub_plan, vocab_counts)
             if not sub_count:               # skip this sub req if it has no count
                 continue
             # if count hasn't been started yet (is 0) or the current sub_count is less than the overall count, 
-            # then change the count to be this sub_count, and replace the vocab with this sub_vocab 
+            # then change the count to be this sub_count, and replace the candidates with this sub_vocab 
             if not count or sub_count < count:
-                vocab = [sub_vocab]
+                candidates = [sub_vocab]
                 count = sub_count
             else:
-                vocab.append(sub_vocab)
-        # among all sub_reqs with the smallest count, use the one with the shortest vocabulary (if there are multiple with shortest, will take the first one)
-        i, shortest_vocab = min([(i, list(flatten_generator(sub_vocab))) for i, sub_vocab in enumerate(vocab)], key=lambda x: len(x[1]))
-        vocab = [vocab[i]]
-    return list(flatten_generator(vocab)), count
+                candidates.append(sub_vocab)
+        # among all candidates, use the one with the shortest vocabulary (if there are multiple with shortest, will take the first one)
+        return (min(candidates, key=len), count) if candidates else ([], 0)
+
+def _get_most_unique_vocab(plans:list, vocab_counts) -> list:
+    """Get the vocabulary of the input requirement (plan) with the smallest count. If there are multiple, use the first one"""
+    unique_vocab, smallest_count = [], 0
+    for plan in plans:
+        vocab, count = _get_plan_vocab_and_count(plan, vocab_counts)
+        if count and (not smallest_count or count < smallest_count):
+            unique_vocab, smallest_count = vocab, count
+    return unique_vocab
+
+def get_command_vocab(input_reqs:list) -> list:
+    """Get all of the tokens of all of a command's input requirements, excluding any empty entries (can include duplicates)"""
+    return [word for word in flatten_generator(_get_input_req_vocab(req) for req in input_reqs) if word]
+
+def get_command_unique_vocab(input_reqs:list, vocab_counts:dict) -> list:
+    """Get the vocabulary of a command's most unique input requirement (see `get_unique_input_vocab_map()`), 
+    where `vocab_counts` is a dict of each token and the number of times it's used across all commands"""
+    plans = [_index_input_req(req, str, []) for req in input_reqs]     # (tokens are their own ids here)
+    return _get_most_unique_vocab(plans, vocab_counts)
+
+def build_input_vocab_indices(commands:dict) -> tuple[dict, dict, dict]:
+    """Generate the vocab-to-command-name index, the unique vocabulary map, and the full vocabulary map of `commands` together 
+    (see `get_input_req_vocab_index()`, `get_unique_input_vocab_map()`, and `get_full_input_vocab_map()`), in a single pass 
+    over each command's input requirements. Each token is interned as an integer id the first time it's seen, 
+    so all counting and comparing of vocabulary is done with ids, and the token strings are only looked up once"""
+    token_ids = {}                                          # token -> id
+    tokens = []                                             # id -> token
+    vocab_counts = {}                                       # id -> number of times the token is used across all commands
+    token_commands = []                                     # id -> list of the names of the commands which use it
+
+    def intern(token:str) -> int:
+        token_id = token_ids.get(token)
+        if token_id is None:
+            token_id = token_ids[token] = len(tokens)
+            tokens.append(token)
+            vocab_counts[token_id] = 0
+            token_commands.append([])
+        return token_id
+
+    with gc_paused():                                       # (without this, building gets slower the more commands there are)
+        # (1) index the vocabulary of each command, and compile its input requirements into plans for finding its most unique vocabulary
+        com_plans = {}
+        com_to_all_vocab = {}
+        for name, data in commands.items():
+            req_tokens = []
+            com_plans[name] = [_index_input_req(req, intern, req_tokens) for req in data["input"]]
+            for token_id in req_tokens:
+                vocab_counts[token_id] += 1
+                token_commands[token_id].append(name)
+            com_to_all_vocab[name] = [tokens[token_id] for token_id in set(req_tokens)]
+        # (2) now that all counts are known, find each command's most unique vocabulary
+        com_to_unique_vocab = {name: [tokens[token_id] for token_id in _get_most_unique_vocab(plans, vocab_counts)] for name, plans in com_plans.items()}
+        vocab_to_com = {tokens[token_id]: names for token_id, names in enumerate(token_commands) if names}
+    return vocab_to_com, com_to_unique_vocab, com_to_all_vocab
 
 def get_input_req_vocab_index(commands:dict) -> dict:
-    """Generate an index of command input requirement words/tokens/vocabulary to command names."""
-    index = {}
-    for name, data in commands.items():
-        func_reqs, input_reqs, actns = data.values()
-        # collect all of the command's input requirement tokens, excluding any empty entries:
-        req_tokens = [word for word in flatten_generator(_get_input_req_vocab(req) for req in input_reqs) if word]
-        for token in req_tokens:
-            try:
-                index[token].append(name)                   # if the req token already exists as a key in index, then update value list with the command name
-            except:
-                index.update({token: [name]})               # otherwise create a new entry, with req token as key, and list with command name as value
-    return index
+    """Generate an index of command input requirement words/tokens/vocabulary to command names.
+    This runs the full `build_input_vocab_indices()`, so callers which need more than one of its indices should call it directly instead."""
+    return build_input_vocab_indices(commands)[0]
 
 def get_unique_input_vocab_map(commands:dict) -> dict:
     """Generate a dict containing the name and vocabulary (word tokens) of each command's most unique 
     input requirement (least used among other commands). Only considers string-type requirements 
-    or string requirements nested in any/all/ordered-types."""
-    com_to_vocab = {}
-    # (1) Create a dict of commands' input requirement words/tokens/vocabulary to command names
-    vocab_counts = {word:len(com_names) for word, com_names in get_input_req_vocab_index(commands).items()}
+    or string requirements nested in any/all/ordered-types. Commands without any are given an empty list.
+    This runs the full `build_input_vocab_indices()`, so callers which need more than one of its indices should call it directly instead."""
+    # (1) Count how many times each of the commands' input requirement words/tokens/vocabulary are used
     # (2) Now determine the input requirement withe the most unique vocabulary in each command
         # - STRING type requirements are simple, and their one value is their entire vocabulary, 
         # and how ever many times that value shows up, is the total count for this req.
@@ -95,21 +160,12 @@ def get_unique_input_vocab_map(commands:dict) -> dict:
         # is because any of the sub reqs could be used in the input to get to the command, so *all* sub-reqs must be considered.
         # - the opposite is true for ALL/ORDERED types because all of the sub-reqs must be used in input, and therefore the use of *any*
         # one of them ensures that this req is reached. Only one STRING type's vocab within the all/ord needs to be used (and so the most unique one / longest is used).
-    for name, data in commands.items():
-        func_reqs, input_reqs, actns = data.values()
-        req_counts = [_get_input_req_string_counts_and_vocab(req, vocab_counts) for req in input_reqs]
-        req_counts = [x for x in req_counts if x[1]]
-        smallest_req_count = min(req_counts, key=lambda x: x[1])
-        com_to_vocab.update({name: smallest_req_count[0]})
-
-    return com_to_vocab
+    return build_input_vocab_indices(commands)[1]
 
 def get_full_input_vocab_map(commands:dict) -> dict:
-    """Generate a dict containing each command's name and the collective vocabulary (word tokens) of all its input requirements"""
-    # for each command, get the vocabulary of each input requirement (data.values()[1]), combine them together in a single list with the flatten_generator, 
-    # remove duplicates by converting to a set, then convert back to a list and use that as the value and command name as key in the dictionary comprehension
-    return {name: list({v for v in flatten_generator(_get_input_req_vocab(req) for req in tuple(data.values())[1]) if v}) for name, data in commands.items()}
-
+    """Generate a dict containing each command's name and the collective vocabulary (word tokens) of all its input requirements.
+    This runs the full `build_input_vocab_indices()`, so callers which need more than one of its indices should call it directly instead."""
+    return build_input_vocab_indices(commands)[2]
 
 #-------- Command Name Filtering Functions --------#
 
@@ -121,11 +177,21 @@ def get_input_req_only_coms(commands:dict):
     """return all commands which have no pre requirements, and only input requirements"""
     return {name:data for name, data in commands.items() if data["input"] and not data["preqs"]}
 
+def _has_open_input_req(input_req:tuple) -> bool:
+    req_type, req_val, rpl_val = input_req
+    if req_type in ("ANY", "ALL", "ORDERED"):
+        return any(_has_open_input_req(sub_req) for sub_req in req_val)
+    return req_type == "OPEN"
+
+def get_open_input_req_coms(commands:dict) -> dict:
+    """return all commands which have an OPEN input requirement (including within any ANY, ALL, or ORDERED requirements)"""
+    return {name:data for name, data in commands.items() if any(_has_open_input_req(req) for req in data["input"])}
+
 
 #-------- Matching Support Functions --------#
 
-def _check_input_req_get_values(req:tuple, input_tokens:list) -> tuple:
-    """Get the matched value and final value of any input requirement.
+def _check_input_req_get_values(req:tuple, analysis:input_proc.InputAnalysis) -> tuple:
+    """Get the matched value and final value of any input requirement, using the shared analysis of the input.
     - 'matched value' is the part of user_input that met the requirement.
     - 'final value' is the value to be used should the requirement be met."""
     matched_value = None
@@ -133,21 +199,21 @@ def _check_input_req_get_values(req:tuple, input_tokens:list) -> tuple:
 
     # STRING - requirement is considered matched if its value is in the input_tokens
     if req_type == "STRING":
-        matched_value = req_val if req_val in input_tokens else None
+        matched_value = req_val if req_val in analysis.token_positions else None
     # OPEN - will be handled later (if all other requirements are met), so just set matched value to be a placeholder
     elif req_type == "OPEN":
         matched_value = _OPEN_PLACEHOLDER
     elif req_type in ("NUMBER", "TIME", "DURATION"):
     # NUMBER - requirement considered matched if a number can be generated within the input text and if the number is within any specified value range
         if req_type == "NUMBER":
-            new_input_tokens, converted_original_tokens = input_proc.convert_words_to_numbers(input_tokens)
+            new_input_tokens, converted_original_tokens = analysis.numbers
             token_condition = lambda tok: is_numbers(tok)
     # INCOMPLETE
         elif req_type == "TIME":
             pass    ### same code as number, but check for time and then convert unix epoch second int
     # DURATION - requirement considered matched if a duration can be generated within the input text and if the duration seconds value is within any specified value range
         elif req_type == "DURATION":
-            new_input_tokens, converted_original_tokens = input_proc.convert_words_to_durations(input_tokens)
+            new_input_tokens, converted_original_tokens = analysis.durations
             token_condition = lambda tok: isinstance(tok, tuple) and tok[0] == input_proc.DURATION_SYMBOL
         # go through each token and check of token_condition is met:
         for token in new_input_tokens:
@@ -161,112 +227,319 @@ def _check_input_req_get_values(req:tuple, input_tokens:list) -> tuple:
     # ANY - requirement isn't a requirement on its own, but is considered met if *any* of the requirements within it are met
     elif req_type == "ANY":
         for sub_req in req_val:
-            sub_matched, sub_final = _check_input_req_get_values(sub_req, input_tokens)
+            sub_matched, sub_final = _check_input_req_get_values(sub_req, analysis)
             if sub_final:           # the final value will not be None if the requirement was met
                 matched_value = sub_matched
                 rpl_val = sub_final
                 break               # only the first met sub req will be used for values (even if multiple may have been met)
     # ALL - is the same as the any-type requirement, except *all* of the contained requirements must be met
     elif req_type in ("ALL", "ORDERED"):
-        sub_matches, sub_finals = zip(*(_check_input_req_get_values(sub_req, input_tokens) for sub_req in req_val))     # create 2 tuples for each return value 
+        sub_matches, sub_finals = zip(*(_check_input_req_get_values(sub_req, analysis) for sub_req in req_val))     # create 2 tuples for each return value 
         if all(sub_finals):                                 # assign sub_matches to matched_value if all are matches
             if isinstance(sub_matches, list) or isinstance(sub_matches, tuple):
                 matched_value = list(flatten_generator(sub_matches))        # if sub_match_vals is list/tuple, make sure there are no sub lists/tuples (flatten)
             else:
                 matched_value = list(sub_matches)
     # ORDERED - same as all-type, but must also be in order, and right next to each other
-            if req_type == "ORDERED":
-                last_i = None
-                for sub_matches in matched_value:
-                    if isinstance(sub_matches, list):
-                        i = input_tokens.index(sub_matches[0])              # get index of the last element in sub-match in input_tokens
-                    else:
-                        i = input_tokens.index(sub_matches)                 # or get index of the sub-match in input_tokens
-                    if not last_i:
-                        last_i = i - 1                                      # if last index not set yet, set it to this current index - 1
-                    if i - 1 != last_i:
-                        matched_value = None                                # if any sub-match's index is not right after the last value's index, then it is not in order
-                        break
-                    if isinstance(sub_matches, list):
-                        last_i = input_tokens.index(sub_matches[-1])        # set last index to be current index of last element in sub_matches before next loop
-                    else:
-                        last_i = i                                          # or set last index to be current index before next loop
+            if req_type == "ORDERED" and _find_token_sequence(matched_value, analysis) is None:
+                matched_value = None                                        # if the sub-matches don't appear anywhere in the input in order and right next to each other, then it isn't met
 
     final_value = rpl_val if matched_value and rpl_val else matched_value   # use a replacement value if specified (and if a match was found), otherwise use matched_value
     return matched_value, final_value
 
-def _get_open_req_value(input_text:str, input_quotes:list, match_values:list):
+def _find_token_sequence(sequence:list, analysis:input_proc.InputAnalysis) -> int|None:
+    """Get the position of the first place in the input tokens where all tokens of `sequence` appear in order and right next to each other.
+    Only the positions of the first token (from the token position index) are tried as starting points, so repeated tokens are 
+    handled correctly, and inputs are never searched from the start. Returns None if the sequence isn't in the input tokens"""
+    input_tokens = analysis.tokens
+    n = len(sequence)
+    for start in analysis.token_positions.get(sequence[0], ()):
+        if input_tokens[start:start + n] == sequence:
+            return start
+    return None
+
+_NUMBER_JOINING_WORDS = ("and", "oh", "point")             # words which can join a number to more number words after them
+
+def _is_input_req_final(req:tuple, analysis:input_proc.InputAnalysis) -> bool:
+    """Check if a requirement which is met by the input's tokens is certain to keep the same final value if more tokens are added to the end of the input"""
+    req_type, req_val, rpl_val = req
+    if req_type in ("OPEN", "TIME"):
+        return False                                        # (an OPEN value is the rest of the input, so it would always change)
+    elif rpl_val or req_type == "STRING":
+        return True                                         # (a met requirement stays met, and its replacement value or string never changes)
+    elif req_type in ("NUMBER", "DURATION"):
+        new_input_tokens = (analysis.numbers if req_type == "NUMBER" else analysis.durations)[0]
+        last_token = new_input_tokens[-1] if new_input_tokens else None
+        return not (is_numbers(last_token) or isinstance(last_token, tuple) or last_token in _NUMBER_JOINING_WORDS)    # (if the input ends with a number or duration, more input could still add on to it)
+    elif req_type == "ANY":
+        for i, sub_req in enumerate(req_val):
+            if _check_input_req_get_values(sub_req, analysis)[1]:
+                return i == 0 and _is_input_req_final(sub_req, analysis)     # (more input could still meet an earlier sub requirement, which would be used instead)
+        return False
+    elif req_type in ("ALL", "ORDERED"):
+        return all(_is_input_req_final(sub_req, analysis) for sub_req in req_val)
+    return False
+
+def _get_open_req_value(analysis:input_proc.InputAnalysis, input_quotes:list, match_values:list):
     """Determine OPEN-type-input-requirement value"""
     # If there was quotes in input, use those as the OPEN req value
     if input_quotes:                            
         open_req_val = input_quotes[-1]                     # always use the last quote if there are multiple
-    # Otherwise, remove the matched values from the input text, and use the last remainder as the OPEN req value:
+    # Otherwise, use the remainder of the input text after the last matched value as the OPEN req value:
     else:
-        SEPARATOR = "___"
-        input_split = input_text.split()                    # start by splitting the input_text by whitespace, and then removing punctuation, but NOT doing full tokenization
-        input_split_stripped = [input_proc.remove_start_end_punctuation(t).lower() for t in input_split]
-        for i, word in enumerate(input_split_stripped):
-            if word in match_values:
-                match_values.remove(word)                   # if the word is a match value, then remove it from match_values,
-                input_split[i] = SEPARATOR                  # and set the match value word in input_split to the separator value
-        open_req_val = ' '.join(input_split).strip()        # join the words back into a single string
-        i = open_req_val.rindex(SEPARATOR) + len(SEPARATOR)
-        open_req_val = open_req_val[i:].strip()             # find the index of last occurrence of the separator, and isolate everything after that index in the string (and remove trailing whitespace)
+        remaining_match_values = Counter(match_values)
+        open_start = 0
+        for token, start, end in analysis.token_spans:
+            if remaining_match_values.get(token):
+                remaining_match_values[token] -= 1          # if the token is a match value, then it can't be matched again,
+                open_start = end                            # and the OPEN req value can only start after it
+        text = analysis.text
+        while open_start < len(text) and not text[open_start].isspace():
+            open_start += 1                                 # skip past the rest of the last matched word (ex: any punctuation right after it)
+        open_req_val = text[open_start:].strip()
 
     return open_req_val
 
 
+def _get_input_analysis(input_text:str|input_proc.InputAnalysis) -> input_proc.InputAnalysis:
+    """Return `input_text` if it is already an `InputAnalysis`, otherwise create one from it"""
+    return input_text if isinstance(input_text, input_proc.InputAnalysis) else input_proc.InputAnalysis(input_text)
+
+
+def _get_preq_check_key(func:Callable, args:tuple) -> tuple:
+    """Get a hashable key which is the same for all pre requirements that call the same function with the same args"""
+    try:
+        hash(args)
+        return (func, args)
+    except TypeError:
+        return (func, repr(args))                           # (args can contain lists, which aren't hashable)
+
+
 #-------- Main Matching Functions --------#
 
 def get_preq_met_commands(commands:dict) -> dict:
     """Get back all commands which have all of their pre requirements met"""
     preq_met_commands = {}
+    return_values = {}                                      # the return value of each distinct (func, args) check, so that each is only called once
     for name, data in commands.items():
-        preqs, input_reqs, actns = data.values()
+        preqs = data["preqs"]
         if not preqs:
             continue                                        # if a command has no pre requirements, skip it
         else:
-            for func, args, val in preqs:                   # otherwise, check each pre requirement
-                if not func(*args) == val:                  # if any of their return values do not match their specified required value, then skip the command
+            for func, args, val, cache in preqs:            # otherwise, check each pre requirement
+                key = _get_preq_check_key(func, args)
+                if key not in return_values:
+                    return_values[key] = func(*args)
+                if not return_values[key] == val:           # if any of their return values do not match their specified required value, then skip the command
                     break
             else:
                 preq_met_commands.update({name: data})      # if all pre reqs are met, add it to the new commands dict
     return preq_met_commands
 
-def get_commands_matching_input_reqs(input_text:str, input_data:str|bytes, commands:dict, transcription_function:Callable) -> tuple:
+def _get_command_input_req_values(input_reqs:list, analysis:input_proc.InputAnalysis) -> tuple[list, list]:
+    """Check each of a command's input requirements against the input analysis, and return a list of 
+    the final value of each requirement, along with a list of all the values which were matched.
+    Each input token can only be used by one requirement, so if a requirement's match value(s) are only in the input tokens
+    as many times as they were already used by earlier requirements, then it isn't met (its final value is None)"""
+    token_positions = analysis.token_positions
+    used_counts = {}                                        # token -> the number of its positions already used by matched values
+    match_values = []
+    req_values = []
+    for req in input_reqs:
+        matched_val, final_val = _check_input_req_get_values(req, analysis)
+        if matched_val and matched_val != _OPEN_PLACEHOLDER:    # (if match value is the OPEN-requirement placeholder, then do nothing for now, as it will be handled later)
+            sub_vals = matched_val if isinstance(matched_val, list) else [matched_val]
+            for sub_val in sub_vals:
+                used = used_counts.get(sub_val, 0)
+                if used >= len(token_positions.get(sub_val, ())):
+                    final_val = None                        # every position of the value was already used
+                    break
+                used_counts[sub_val] = used + 1
+            match_values.extend(sub_vals)                   # add them to match_values (will be needed later if there's an OPEN type req)
+        req_values.append(final_val)                        # append the final value to the req_values list
+    return req_values, match_values
+
+def _fill_open_req_value(req_values:list, match_values:list, analysis:input_proc.InputAnalysis, input_data:str|bytes, transcription_function:Callable):
+    """If there is an OPEN requirement in `req_values`, replace its placeholder with the actual OPEN requirement value"""
+    if _OPEN_PLACEHOLDER in req_values:                     # check if there was an OPEN requirement, and determine its value
+        i = req_values.index(_OPEN_PLACEHOLDER)
+        open_analysis = analysis
+        if isinstance(input_data, bytes):                   # if input came from voice, first re-transcribe the original input voice audio with full vocabulary, and use that as input text:
+            open_analysis = input_proc.InputAnalysis(transcription_function(input_data))
+        req_values[i] = _get_open_req_value(open_analysis, analysis.quotes, match_values)   # replace open-placeholder with OPEN req value
+
+def get_commands_matching_input_reqs(input_text:str|input_proc.InputAnalysis, input_data:str|bytes, commands:dict, transcription_function:Callable) -> tuple:
     """Pass in input text and the list of commands, and return the name and input requirement values
-    of the first command which has all of its input requirements met."""
-    input_tokens, input_quotes = input_proc.get_basic_tokens_and_quote_sections(input_text)     # split input_text into words/tokens (and extract any quote sections)
-    #all_command_req_values = {}
+    of the first command which has all of its input requirements met.
+    `input_text` can also be an `InputAnalysis` of the input text, if one was already created for it."""
+    analysis = _get_input_analysis(input_text)              # the input text is only split into words/tokens (and quote sections) once, and shared by all requirement checks
     for name, data in commands.items():
-        temp_input_tokens = input_tokens.copy()
-        func_reqs, input_reqs, actns = data.values()
-        match_values = []
-        req_values = []
         # 1) check each individual input requirement in each command
-        for req in input_reqs:
-            matched_val, final_val = _check_input_req_get_values(req, input_tokens)
-            if matched_val:                                 # if the req was matched,
-                if matched_val == _OPEN_PLACEHOLDER:        # if match value is the OPEN-requirement placeholder, then do nothing for now (will be handled later)
-                    pass
-                elif isinstance(matched_val, list):
-                    for sub_val in matched_val:
-                        match_values.append(sub_val)        # add them to match_values (will be needed later if there's an OPEN type req),
-                        i = temp_input_tokens.index(sub_val)
-                        temp_input_tokens[i] = None         # and replace the match value(s) in temp_input_tokens with None (this way a value(s) can only be used once)
-                else:
-                    match_values.append(matched_val)
-                    i = temp_input_tokens.index(matched_val)
-                    temp_input_tokens[i] = None
-            req_values.append(final_val)                    # append the final value to the req_values list
-        
+        req_values, match_values = _get_command_input_req_values(data["input"], analysis)
         # 2) if all input requirements have been met, get any remaining req values and return the command and the values
         if all(req_values):
-            if _OPEN_PLACEHOLDER in req_values:             # check if there was an OPEN requirement, and determine its value
-                i = req_values.index(_OPEN_PLACEHOLDER)
-                if isinstance(input_data, bytes):           # if input came from voice, first re-transcribe the original input voice audio with full vocabulary, and use that as input_text:
-                    input_text = transcription_function(input_data)
-                req_values[i] = _get_open_req_value(input_text, input_quotes, match_values) # replace open-placeholder with OPEN req value
+            _fill_open_req_value(req_values, match_values, analysis, input_data, transcription_function)
             return name, req_values                         # return the command name and its req values
     
-    return None, []                                         # if no command is fully met, return None and empty list
\ No newline at end of file
+    return None, []                                         # if no command is fully met, return None and empty list
+
+
+#-------- Pre Requirement Checker --------#
+
+class PreReqChecker:
+    def __init__(self, commands:dict):
+        """
+        A compiled form of all of the commands' pre requirements, grouped by their distinct (func, args) checks.
+
+        Every time `get_preq_met_commands()` is called (once per main loop cycle), each distinct check is called at most once,
+        no matter how many commands share it. Checks whose function has a cache declared in the command data are reused between calls:
+        - a number: the return value is reused for that many seconds
+        - `PREQ_CACHE_ON_CHANGE`: the return value is reused until `state_changed()` is called
+        """
+        self._commands = commands
+        self._checks = {}                                   # check key -> (func, args, cache)
+        self._command_preqs = {}                            # command name -> list of (check key, required return value) tuples
+        for name, data in commands.items():
+            if not data["preqs"]:
+                continue
+            preqs = []
+            for func, args, val, cache in data["preqs"]:
+                key = _get_preq_check_key(func, args)
+                self._checks.setdefault(key, (func, args, cache))
+                preqs.append((key, val))
+            self._command_preqs[name] = preqs
+        self._ttl_cache = {}                                # check key -> (return value, expiry time)
+        self._on_change_cache = {}                          # check key -> return value
+
+    def _check(self, key:tuple, now:float, on_change_cache:dict):
+        """Get the return value of a single check, reusing a cached one if still valid"""
+        func, args, cache = self._checks[key]
+        if cache == PREQ_CACHE_ON_CHANGE:
+            if key not in on_change_cache:
+                on_change_cache[key] = func(*args)
+            return on_change_cache[key]
+        elif cache:
+            value, expiry = self._ttl_cache.get(key, (None, 0))
+            if now >= expiry:
+                value = func(*args)
+                self._ttl_cache[key] = (value, now + cache)
+            return value
+        return func(*args)
+
+    def get_preq_met_commands(self) -> dict:
+        """Get back all commands which have all of their pre requirements met"""
+        now = monotonic()
+        on_change_cache = self._on_change_cache             # (if `state_changed()` is called during this, any values stored here will just be discarded)
+        return_values = {}
+        preq_met_commands = {}
+        for name, preqs in self._command_preqs.items():
+            for key, val in preqs:
+                if key not in return_values:
+                    return_values[key] = self._check(key, now, on_change_cache)
+                if not return_values[key] == val:
+                    break
+            else:
+                preq_met_commands[name] = self._commands[name]
+        return preq_met_commands
+
+    def state_changed(self):
+        """Discard all cached return values of `PREQ_CACHE_ON_CHANGE` checks"""
+        self._on_change_cache = {}
+
+
+#-------- Compiled Command Matcher --------#
+
+def _get_input_req_trigger_tokens(input_req:tuple) -> set|None:
+    """Get the set of tokens of which at least one must be present in the input tokens for an input requirement to be met.
+    Returns None if the requirement can't be narrowed down to a set of tokens (OPEN, NUMBER, TIME, DURATION, 
+    or an ANY-type containing any of these)"""
+    req_type, req_val, rpl_val = input_req
+    if req_type == "STRING":
+        return {req_val}
+    elif req_type == "ANY":                                 # *any* of the sub reqs can be met, so every one of their triggers must be included
+        sub_triggers = [_get_input_req_trigger_tokens(sub_req) for sub_req in req_val]
+        if None in sub_triggers:
+            return None
+        return set().union(*sub_triggers)
+    elif req_type in ("ALL", "ORDERED"):                    # *all* of the sub reqs must be met, so the trigger of any one of them is enough (use the smallest)
+        sub_triggers = [t for t in (_get_input_req_trigger_tokens(sub_req) for sub_req in req_val) if t is not None]
+        return min(sub_triggers, key=len) if sub_triggers else None
+    return None
+
+class CommandMatcher:
+    def __init__(self, commands:dict):
+        """
+        A compiled form of a command dict, for quickly finding the first command which has all of its input requirements met.
+
+        Every input requirement that can be narrowed down to a set of tokens becomes a 'gate' of its command, and all gates
+        are combined into a single token-keyed index. When matching, the input tokens are read once to see which gates are
+        opened, and only commands with all of their gates open are fully checked (in the same order as `commands`). 
+        Commands which have no gates at all (ex: only OPEN or NUMBER requirements) are always fully checked.
+        """
+        self._commands = commands
+        self._names = list(commands)
+        self._token_to_gates = {}                           # token -> list of (command index, gate index) tuples
+        self._gate_counts = []                              # the number of gates of each command, by command index
+        self._ungated = []                                  # the indices of commands without any gates
+        for com_i, data in enumerate(commands.values()):
+            gates = [t for t in (_get_input_req_trigger_tokens(req) for req in data["input"]) if t is not None]
+            self._gate_counts.append(len(gates))
+            if not gates:
+                self._ungated.append(com_i)
+            for gate_i, tokens in enumerate(gates):
+                for token in tokens:
+                    self._token_to_gates.setdefault(token, []).append((com_i, gate_i))
+
+    def _get_open_gates(self, input_tokens:list) -> dict:
+        """Get the index of each command which has any of its gates opened by `input_tokens`, and the set of the indices of those gates"""
+        open_gates = {}
+        for token in set(input_tokens):
+            for com_i, gate_i in self._token_to_gates.get(token, ()):
+                open_gates.setdefault(com_i, set()).add(gate_i)
+        return open_gates
+
+    def get_candidate_names(self, input_tokens:list) -> list:
+        """Get the names of all commands which could possibly have their input requirements met by `input_tokens`, in command order"""
+        open_gates = self._get_open_gates(input_tokens)
+        candidates = [com_i for com_i, gates in open_gates.items() if len(gates) == self._gate_counts[com_i]]
+        return [self._names[com_i] for com_i in sorted(candidates + self._ungated)]
+
+    def match(self, input_text:str|input_proc.InputAnalysis, input_data:str|bytes, transcription_function:Callable, commands:dict=None) -> tuple:
+        """Same as `get_commands_matching_input_reqs()`, but only fully checks the commands which pass through the compiled gates.
+        If `commands` is provided, then only commands which are also in it will be considered, in the same order as `commands`
+        (just like `get_commands_matching_input_reqs()`). Otherwise, they're checked in command order."""
+        analysis = _get_input_analysis(input_text)
+        names = self.get_candidate_names(analysis.tokens)
+        if commands is not None:
+            candidates = set(names)
+            names = [name for name in commands if name in candidates]
+        for name in names:
+            req_values, match_values = _get_command_input_req_values(self._commands[name]["input"], analysis)
+            if all(req_values):
+                _fill_open_req_value(req_values, match_values, analysis, input_data, transcription_function)
+                return name, req_values
+        return None, []
+
+    def match_prefix(self, input_text:str|input_proc.InputAnalysis, commands:dict=None) -> tuple:
+        """Check the beginning of an input which is still growing (ex: the partial transcription of a voice phrase which is still being spoken),
+        and get the name and input requirement values of the command that it meets, but only if more input can't change the result:
+        - the command is the first one which is met (in command order, or the order of `commands`), and none of its requirements' values could change with more input
+        - no command before it has any of its requirements met yet (as more input could finish meeting it)
+
+        Otherwise (or if no command is met), returns `(None, [])`. Commands with OPEN requirements are never met this way.
+        The tokens of the input must only ever be added to, not changed, and `commands` works the same as in `match()`."""
+        analysis = _get_input_analysis(input_text)
+        names = [self._names[com_i] for com_i in sorted(set(self._get_open_gates(analysis.tokens)).union(self._ungated))]
+        if commands is not None:
+            candidates = set(names)
+            names = [name for name in commands if name in candidates]
+        for name in names:
+            input_reqs = self._commands[name]["input"]
+            req_values, match_values = _get_command_input_req_values(input_reqs, analysis)
+            if all(req_values):
+                if all(_is_input_req_final(req, analysis) for req in input_reqs):
+                    return name, req_values
+                return None, []
+            if any(value and value != _OPEN_PLACEHOLDER for value in req_values):
+                return None, []                             # (more input could still finish meeting this command, which would be used instead)
+        return None, []
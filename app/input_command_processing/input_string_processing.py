@@ -1,3 +1,5 @@
+import re
+from functools import cached_property
 from .misc_tools import is_numbers
 
 #-------- Word Maps --------#
@@ -87,20 +89,23 @@ DAY_WORD_MAP = {
 DURATION_SYMBOL = 'DUR'
 
 
+#-------- Tokenization Patterns --------#
+
+# matches either a section surrounded by double quote characters (group 1 is the section without any surrounding whitespace),
+# or a single word (group 2 is everything in the word between its first and last alpha-numeric characters)
+_WORD_OR_QUOTE_PATTERN = re.compile(r'"\s*([^"]*?)\s*"|(?:_|[^\w\s"])*([^\W_](?:[^\s"]*[^\W_])?)[^\s"]*|[^\s"]+')
+
+
 #-------- Supporting Functions --------#
 
 def remove_start_end_punctuation(word:str) -> str:
     """remove all non-alpha-numeric characters from the beginning and end of a word"""
-    while True:
-        if word:                                            # break if word is empty! (will happen if a word has no alpha numeric chars)
-            if not word[0].isalnum():
-                word = word[1:]                             # remove first character and restart loop
-                continue
-            elif not word[-1].isalnum():
-                word = word[:-1]                            # remove last character and restart loop
-                continue
-        break
-    return word
+    start, end = 0, len(word)
+    while start < end and not word[start].isalnum():        # find the first alpha-numeric character
+        start += 1
+    while end > start and not word[end-1].isalnum():        # find the last alpha-numeric character
+        end -= 1
+    return word[start:end]                                  # (will be empty if a word has no alpha numeric chars)
 
 def _get_number_from_string(num_str:str) -> int|float:
     """try converting string into int or float, otherwise return None"""
@@ -144,62 +149,58 @@ def _get_number_str_from_words(num_words:list) -> str:
 
 #-------- Tokenization Functions (main accessible functions) --------#
 
-def get_basic_tokens_and_quote_sections(text:str) -> tuple[list[str], list[str]]:
-    """Returns a list containing only the individual words/tokens within a string of text, 
-    along with a list of strings which were surrounded by quotes. Meant to be used with a sentence or phrase."""
+def get_token_and_quote_spans(text:str) -> tuple[list[tuple[str, int, int]], list[tuple[str, int, int]]]:
+    """Same as `get_basic_tokens_and_quote_sections()`, but each token and quote is returned as a tuple of 
+    (token, start, end), where `start` and `end` are the character offsets of the token within `text`.
+    The text is only read through once."""
     tokens = []
     quotes = []
-    current_word = ''
-    current_sentence = ''
-
-    def add_current_word():
-        stripped_word = remove_start_end_punctuation(current_word).lower()
-        if stripped_word:
-            tokens.append(stripped_word)
-    
-    # first check for all instances of the words "quote" and "unquote" in order in the string, and replace any of these pairs with double quote characters, surrounding the text between them
-    while True:
-        if "quote" in text.lower() and "unquote" in text.lower():
-            text_split = text.split()
-            text_stripped_words = [remove_start_end_punctuation(word).lower() for word in text_split]
-            try:
-                q1 = text_stripped_words.index("quote")
-                q2 = text_stripped_words.index("unquote")
-                if q2 > q1:
-                    text_split[q1+1] = '"' + text_split[q1+1]   # add first quote char to the left of the word after 'quote'
-                    text_split[q2-1] = text_split[q2-1] + '"'   # add second quote char to the right of the word after 'unquote'
-                    text_split.pop(q2)
-                    text_split.pop(q1)
-                text = ' '.join(text_split)
-            except:
-                pass
-        else:
-            break
-    # now go through the text one character at a time
-    for char in text:
-        if char == ' ' and current_word:                    # if the character is a whitespace and `current_word` is not empty, append a cleaned up version of it to tokens
-            add_current_word()
-            current_word= ''
-        elif char == '"':                                   # if the character is a double quote, either treat it as the start of the sentence, or the end of it. Append any complete sentence to tokens and quotes
-            if current_sentence:
-                tokens.append(current_sentence[1:])         # index from 1 to remove the initial quote (") character
-                quotes.append(current_sentence[1:])
-                current_sentence = ''
-            else:
-                current_sentence += char
-        else:                                               # otherwise, append the character to current_string if it's not empty, and current_word if it is
-            if current_sentence:
-                current_sentence += char
-            else:
-                current_word += char
-    if current_word:                                        # append any remaining current_word to tokens
-        add_current_word()
-    if current_sentence:                                    # if a sentence was started but never completed, then treat it as individual words
-        new_tokens, quotes = get_basic_tokens_and_quote_sections(current_sentence)
-        tokens.extend(new_tokens)
+    open_marker = None                                      # (index in tokens, end offset) of the last "quote" word which doesn't have an "unquote" word after it yet
+
+    for match in _WORD_OR_QUOTE_PATTERN.finditer(text):
+        quote, word = match.group(1, 2)
+        # a section surrounded by double quote characters is a single token, and a quote
+        if quote is not None:
+            if quote:
+                span = (quote, *match.span(1))
+                tokens.append(span)
+                quotes.append(span)
+            continue
+        # otherwise it's a single word -> only use the part without any non-alpha-numeric characters at its beginning and end
+        if not word:
+            continue
+        word = word.lower()
+        # the words "quote" and "unquote" (in order) replace double quote characters, surrounding the text between them
+        if word == "unquote" and open_marker:
+            i, start = open_marker
+            end = match.start()
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end-1].isspace():
+                end -= 1
+            del tokens[i:]                                  # remove the "quote" word and every token after it,
+            while quotes and quotes[-1][1] >= start:
+                quotes.pop()                                # (including any quotes within it)
+            open_marker = None
+            if start < end:
+                span = (text[start:end], start, end)        # and replace them with the text between "quote" and "unquote"
+                tokens.append(span)
+                quotes.append(span)
+            continue
+        if word == "quote" and not open_marker:
+            open_marker = (len(tokens), match.end())
+        tokens.append((word, *match.span(2)))
 
     return tokens, quotes
 
+def get_basic_tokens_and_quote_sections(text:str) -> tuple[list[str], list[str]]:
+    """Returns a list containing only the individual words/tokens within a string of text, 
+    along with a list of strings which were surrounded by quotes. Meant to be used with a sentence or phrase.
+    Any whitespace (including tabs and newlines) separates words, any whitespace at the start and end of a quote is trimmed, 
+    and empty quotes are dropped."""
+    tokens, quotes = get_token_and_quote_spans(text)
+    return [token for token, start, end in tokens], [quote for quote, start, end in quotes]
+
 
 def convert_words_to_numbers(words:list[str]) -> tuple[list, list]:
     """Convert all of the number words in a list into actual numbers. Also return a list of each group of words what was converted."""
@@ -266,11 +267,15 @@ def convert_words_numbers_to_times(words_numbers:list):
     pass
 
 
-def convert_words_to_durations(words:list) -> tuple[list, list]:
-    """Convert all of the words in a list into integers representing duration in seconds"""
+def convert_words_to_durations(words:list, numbers:tuple[list, list]=None) -> tuple[list, list]:
+    """Convert all of the words in a list into integers representing duration in seconds.
+    If the return value of `convert_words_to_numbers()` for the same words is already available, it can be passed in as `numbers`"""
     # all spoken/written durations will roughly follow the formula of: 'quantity' (which is a word or number) + durational unit (a word)
     # and if these 'quantity + unit' pairs are next to each other (or separated by 'and'), they belong to the same duration
-    tokens, converted = convert_words_to_numbers(words)     # first convert number words and colloquial quantity words to numbers
+    if numbers:
+        tokens, converted = numbers[0], numbers[1].copy()   # copy the converted list, as items will be popped from it below
+    else:
+        tokens, converted = convert_words_to_numbers(words) # first convert number words and colloquial quantity words to numbers
     new_tokens = []                                         # holds the words, numbers, and newly created times
     last_token = None                                       # the previous token in the list cycle
     # 1) First cycle -> pair up quantities (numbers) and durational units ('minute', 'hour', etc.)
@@ -352,3 +357,55 @@ def convert_words_to_durations(words:list) -> tuple[list, list]:
 
     process_current_duration()                              # process any remaining durations
     return new_tokens, converted_words
+
+
+#-------- Input Analysis --------#
+
+class InputAnalysis:
+    def __init__(self, text:str):
+        """
+        Holds every view of a single input text that command matching needs. Each view is only computed 
+        the first time it is accessed, and then reused for all requirement checks of all commands.
+
+        - `token_spans` and `quote_spans` - the return values of `get_token_and_quote_spans()`
+        - `tokens` and `quotes` - the same as above, without the offsets (the return values of `get_basic_tokens_and_quote_sections()`)
+        - `token_positions` - an index of each distinct token and the (ascending) list of its positions in `tokens`
+        - `numbers` - the return value of `convert_words_to_numbers()` for `tokens`
+        - `durations` - the return value of `convert_words_to_durations()` for `tokens`
+        """
+        self.text = text
+
+    @cached_property
+    def _spans(self) -> tuple[list[tuple[str, int, int]], list[tuple[str, int, int]]]:
+        return get_token_and_quote_spans(self.text)
+
+    @property
+    def token_spans(self) -> list[tuple[str, int, int]]:
+        return self._spans[0]
+
+    @property
+    def quote_spans(self) -> list[tuple[str, int, int]]:
+        return self._spans[1]
+
+    @cached_property
+    def tokens(self) -> list[str]:
+        return [token for token, start, end in self.token_spans]
+
+    @cached_property
+    def quotes(self) -> list[str]:
+        return [quote for quote, start, end in self.quote_spans]
+
+    @cached_property
+    def token_positions(self) -> dict[str, list[int]]:
+        positions = {}
+        for i, token in enumerate(self.tokens):
+            positions.setdefault(token, []).append(i)
+        return positions
+
+    @cached_property
+    def numbers(self) -> tuple[list, list]:
+        return convert_words_to_numbers(self.tokens)
+
+    @cached_property
+    def durations(self) -> tuple[list, list]:
+        return convert_words_to_durations(self.tokens, self.numbers)
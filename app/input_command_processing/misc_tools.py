@@ -1,3 +1,6 @@
+import gc
+from contextlib import contextmanager
+
 def flatten_generator(container:list|tuple|set):
     """Pass in a list, tuple, or set which can have any number of other lists/tuples/sets 
     or non container items within, as well as any arbitrary depth for further 
@@ -18,3 +21,15 @@ def is_numbers(x):
         if not isinstance(x, (int, float)) or isinstance(x, bool):
             return False
     return True
+
+@contextmanager
+def gc_paused():
+    """Pause garbage collection within a `with` block. Use this for code which creates a lot of objects but no garbage 
+    (such as building indices), as collections would only slow it down, and more so the more objects there are"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class CommandVocabMatrix:
+    def __init__(self, vocab_to_com:dict, command_names:list, vocab_filter:list=None):
+        """
+        A sparse (command x vocab) incidence matrix, built from a vocab-to-command-name index (see `get_input_req_vocab_index()`).
+
+        The matrix is stored column-wise (like a CSC matrix): `_indptr[v]` to `_indptr[v+1]` is the slice of `_indices`
+        containing the row (command) index of every command which uses the vocab with the id `v`.
+        - `command_names` is the list of all command names, in the order they should be indexed as rows
+        - `vocab_filter` (optional) is a list of vocab to restrict the overlap scoring to. By default, all vocab is used
+        """
+        self.command_names = list(command_names)
+        self.vocab_ids = {}                                 # vocab/token -> column id
+        row_ids = {name:i for i, name in enumerate(self.command_names)}
+        indptr = [0]
+        indices = []
+        for token, com_names in vocab_to_com.items():
+            self.vocab_ids[token] = len(self.vocab_ids)
+            indices.extend(row_ids[name] for name in com_names)
+            indptr.append(len(indices))
+        self._indptr = np.array(indptr, dtype=np.int64)
+        self._indices = np.array(indices, dtype=np.int64)
+        # a mask of which columns to include when scoring:
+        self._col_mask = np.ones(len(self.vocab_ids), dtype=bool)
+        if vocab_filter is not None:
+            self._col_mask[:] = False
+            self._col_mask[[self.vocab_ids[token] for token in set(vocab_filter) if token in self.vocab_ids]] = True
+
+    def get_vocab_ids(self, tokens:list) -> np.ndarray:
+        """Get an array of the column ids of each token which is in the matrix vocab (and the vocab filter)"""
+        cols = np.fromiter((self.vocab_ids[token] for token in tokens if token in self.vocab_ids), dtype=np.int64)
+        return cols[self._col_mask[cols]]
+
+    def _get_rows(self, cols:np.ndarray) -> np.ndarray:
+        """Gather the row indices of every non-zero entry within the given columns, in a single vectorized operation"""
+        starts = self._indptr[cols]
+        lengths = self._indptr[cols + 1] - starts
+        offsets = np.cumsum(lengths) - lengths              # where each column's rows begin in the gathered array
+        positions = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+        return self._indices[positions]
+
+    def get_overlap_scores(self, input_tokens:list) -> dict:
+        """Get a dict of the name and overlap score (number of vocab entries shared with `input_tokens`)
+        of each command which has any overlap with `input_tokens`.
+        This is the (command x vocab) matrix multiplied by the input's vocab count vector, without ever touching the zero entries.
+        Commands are ordered by the first input token they share, then by their order in the vocab index (the order in which they're matched)."""
+        rows, first_positions, scores = np.unique(self._get_rows(self.get_vocab_ids(input_tokens)), return_index=True, return_counts=True)
+        order = np.argsort(first_positions, kind='stable')  # (np.unique sorts by row, so restore the order in which each row was first gathered)
+        return {self.command_names[row]: int(score) for row, score in zip(rows[order].tolist(), scores[order].tolist())}
+
+    def get_batch_overlap_scores(self, input_token_lists:list) -> list:
+        """Same as `get_overlap_scores()`, but for many inputs at once. Returns a list with an overlap score dict for each list of tokens.
+        All tokens are gathered into one array (alongside the index of the input they came from), so that every input
+        is scored with a single vectorized gather and count, instead of one per input."""
+        n_rows = max(len(self.command_names), 1)
+        cols = []
+        owners = []                                         # the index of the input that each column id came from
+        for i, tokens in enumerate(input_token_lists):
+            for token in tokens:
+                col = self.vocab_ids.get(token)
+                if col is not None:
+                    cols.append(col)
+                    owners.append(i)
+        cols = np.array(cols, dtype=np.int64)
+        owners = np.array(owners, dtype=np.int64)
+        keep = self._col_mask[cols]
+        cols, owners = cols[keep], owners[keep]
+        owners = np.repeat(owners, self._indptr[cols + 1] - self._indptr[cols])     # one owner for each gathered row
+        keys, first_positions, scores = np.unique(owners * n_rows + self._get_rows(cols), return_index=True, return_counts=True)
+        order = np.argsort(first_positions, kind='stable')  # (same order as `get_overlap_scores()`)
+        batch_scores = [{} for tokens in input_token_lists]
+        for key, score in zip(keys[order].tolist(), scores[order].tolist()):
+            owner, row = divmod(key, n_rows)
+            batch_scores[owner][self.command_names[row]] = score
+        return batch_scores
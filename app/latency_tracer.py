@@ -0,0 +1,137 @@
+from threading import Lock
+from collections import deque
+from time import monotonic
+from math import ceil
+import json
+
+#------
+
+def get_percentile(sorted_values:list, percent:float) -> float:
+    """Get the nearest-rank percentile of an already sorted list of values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+def get_summary(durations) -> dict:
+    """Get the count, p50, p95, p99, and max of a collection of durations (in seconds)"""
+    values = sorted(durations)
+    return {
+        "count":    len(values),
+        "p50":      get_percentile(values, 50),
+        "p95":      get_percentile(values, 95),
+        "p99":      get_percentile(values, 99),
+        "max":      values[-1] if values else 0.0
+    }
+
+#------
+
+class InputTrace():
+    def __init__(self, tracer):
+        """
+        The trace of a single input, going through the stages of the main loop. Call `mark()` at the end of each stage,
+        and `finish()` once the input is done (whether or not a command was met), to record it with the tracer.
+        """
+        self._tracer = tracer
+        self.start_time = monotonic()
+        self._last_time = self.start_time
+        self.stages = {}                        # stage name -> total seconds spent in the stage (in the order the stages were first marked)
+
+    def mark(self, stage:str):
+        """Add the time since the last mark (or the start of the trace) to `stage`"""
+        now = monotonic()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last_time)
+        self._last_time = now
+
+    def wrap(self, func, stage:str, outer_stage:str):
+        """Wrap a function so that the time spent calling it is added to `stage`, instead of to `outer_stage` (the stage it's called from)"""
+        def traced(*args, **kwargs):
+            self.mark(outer_stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.mark(stage)
+        return traced
+
+    def finish(self, command_name:str=None):
+        """Record the trace with the tracer. `command_name` is the name of the command that the input met (if any)"""
+        self._tracer._record(self, command_name, self._last_time - self.start_time)
+
+class _NullTrace():
+    """Stands in for an `InputTrace` while tracing is disabled, so that tracing costs no more than a few empty method calls"""
+    stages = {}
+
+    def mark(self, stage:str):
+        pass
+
+    def wrap(self, func, stage:str, outer_stage:str):
+        return func
+
+    def finish(self, command_name:str=None):
+        pass
+
+_NULL_TRACE = _NullTrace()
+
+#------
+
+class LatencyTracer():
+    def __init__(self, enabled:bool=False, window:int=1000):
+        """
+        Collects the per-stage latencies of every input going through the main loop (see `InputTrace`),
+        and keeps rolling windows of them for each stage, and for each command that inputs met.
+
+        - `enabled` - whether or not to trace inputs. While disabled, `start_trace()` returns a trace that does nothing
+        - `window` - the max number of most recent latencies to keep for each stage and each command
+        """
+        self.enabled = enabled
+        self.window = window
+        self._lock = Lock()                     # guards everything below (traces are recorded by the main loop, and read from any thread)
+        self._stages = {}                       # stage name -> deque of its most recent durations
+        self._commands = {}                     # command name -> deque of the most recent total latencies of inputs which met it
+        self._n_traces = 0
+
+    def start_trace(self) -> InputTrace|_NullTrace:
+        """Start the trace of a new input"""
+        return InputTrace(self) if self.enabled else _NULL_TRACE
+
+    def _record(self, trace:InputTrace, command_name:str, total_time:float):
+        with self._lock:
+            self._n_traces += 1
+            for stage, duration in trace.stages.items():
+                self._stages.setdefault(stage, deque(maxlen=self.window)).append(duration)
+            self._stages.setdefault("total", deque(maxlen=self.window)).append(total_time)
+            if command_name:
+                self._commands.setdefault(command_name, deque(maxlen=self.window)).append(total_time)
+
+    def get_stats(self) -> dict:
+        """Get the count, p50, p95, p99, and max latencies (in seconds) of each stage, and of each command (the total latency of the inputs which met it)"""
+        with self._lock:
+            stages = {stage: list(durations) for stage, durations in self._stages.items()}
+            commands = {name: list(durations) for name, durations in self._commands.items()}
+            n_traces = self._n_traces
+        return {
+            "traces":   n_traces,
+            "stages":   {stage: get_summary(durations) for stage, durations in stages.items()},
+            "commands": {name: get_summary(durations) for name, durations in commands.items()}
+        }
+
+    def get_stats_text(self) -> str:
+        """Get a short readable summary of the p50/p95/p99 latency of each stage (in milliseconds)"""
+        stats = self.get_stats()
+        if not stats["traces"]:
+            return "no inputs have been traced" if self.enabled else "latency tracing is disabled"
+        lines = [f'{stats["traces"]} inputs traced (p50/p95/p99 ms):']
+        for stage, summary in stats["stages"].items():
+            lines.append(f'{stage}: {summary["p50"]*1000:.1f}/{summary["p95"]*1000:.1f}/{summary["p99"]*1000:.1f}')
+        return '\n'.join(lines)
+
+    def dump(self, filepath:str):
+        """Write the current stats to a JSON file (replacing it)"""
+        with open(filepath, 'w') as file:
+            json.dump(self.get_stats(), file, indent=4)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._commands.clear()
+            self._n_traces = 0
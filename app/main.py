@@ -1,10 +1,15 @@
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition, Event
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from subprocess import run
-from time import sleep
+from os import stat
 from pprint import pprint
-from .GUI_audio_voice.GUI_tk import tkTextBoxGUI
-from .input_command_processing import command_data_loader as com_loader, command_processing as com_proc, input_string_processing as input_proc
+from .input_command_processing import command_cache as com_cache, command_data_loader as com_loader, command_processing as com_proc, input_string_processing as input_proc
+from .input_command_processing.command_index import CommandIndex
 from .input_command_processing.misc_tools import flatten_generator
+from .action_executor import ActionExecutor
+from .latency_tracer import LatencyTracer
+from .GUI_audio_voice.base_UI import BaseUI
 
 #------
 
@@ -21,24 +26,93 @@ def debug_pprint(*args, title=None):
 
 #------
 
+MAX_CACHED_VOCAB_SETS = 256         # the max number of sets of commands to keep the transcription vocabulary of (per vocabulary type)
+
+class _CompiledCommands():
+    def __init__(self, commands:dict, index:CommandIndex, general_vocab:list):
+        """
+        All of the commands, and everything compiled and indexed from them, which the main loop uses. Whenever the commands are reloaded, 
+        a new one of these is built and then swapped in all at once, so that the main loop never uses a mix of old and new commands.
+
+        The transcription vocabulary of each set of commands that the main loop reaches (see `get_unique_vocab()` and `get_full_vocab()`) 
+        is only computed once, so that the same vocabulary (and vosk grammar) is reused for every voice input with the same set of commands.
+        """
+        self.commands = commands
+        self.preq_only_commands = com_proc.get_pre_req_only_coms(commands)         # all commands which have only pre requirements and no input requirements
+        self.input_only_commands = com_proc.get_input_req_only_coms(commands)       # all commands which have only input requirements and no pre requirements
+        self.open_req_commands = com_proc.get_open_input_req_coms(commands)         # all commands which have an OPEN input requirement
+        self.matcher = com_proc.CommandMatcher(commands)                            # all command input requirements compiled into a single matcher
+        self.preq_checker = com_proc.PreReqChecker(commands)                        # all command pre requirements grouped by their distinct checks
+        self.com_to_unique_vocab = dict(index.com_to_unique_vocab)                  # an index of each command's most unique input requirement's vocabulary
+        self.com_to_all_vocab = dict(index.com_to_all_vocab)                        # an index of each command's vocabulary for all input requirements
+        self.unique_vocab_list = index.get_unique_vocab_list()                      # a list of the most unique vocabulary
+        from .input_command_processing.vocab_matrix import CommandVocabMatrix       # (only imported when used, as numpy is slow to import)
+        self.vocab_matrix = CommandVocabMatrix(index.vocab_to_com, list(commands), self.unique_vocab_list)    # a sparse command-by-vocab matrix, scoring only the most unique vocabulary
+        self.general_vocab = list(general_vocab)                                    # general words to include in every transcription vocabulary
+        self._unique_vocab_cache = {}                                               # frozenset of command names -> their deduplicated most unique vocabulary
+        self._full_vocab_cache = {}                                                 # frozenset of command names -> their deduplicated full vocabulary
+        self.get_unique_vocab(self.input_only_commands)                             # (precompute the vocabulary of the set which is reached whenever no pre requirements are met)
+
+    def _get_vocab(self, cache:dict, com_to_vocab:dict, command_names) -> tuple:
+        key = frozenset(command_names)
+        vocab = cache.get(key)
+        if vocab is None:
+            vocab = tuple(dict.fromkeys(flatten_generator([com_to_vocab.get(name, ()) for name in command_names] + [self.general_vocab])))
+            if len(cache) >= MAX_CACHED_VOCAB_SETS:
+                cache.pop(next(iter(cache)))                                        # (discard the oldest set)
+            cache[key] = vocab
+        return vocab
+
+    def get_unique_vocab(self, command_names) -> tuple:
+        """Get the deduplicated most unique vocabulary of the commands (and the general vocabulary), for the first transcription of voice input"""
+        return self._get_vocab(self._unique_vocab_cache, self.com_to_unique_vocab, command_names)
+
+    def get_full_vocab(self, command_names) -> tuple:
+        """Get the deduplicated vocabulary of all input requirements of the commands (and the general vocabulary), for the second transcription of voice input"""
+        return self._get_vocab(self._full_vocab_cache, self.com_to_all_vocab, command_names)
+
 class App():
-    def __init__(self, commands_path:str, user_func_map:dict=None):
+    def __init__(self, commands_path:str, user_func_map:dict=None, ui=None, use_command_cache:bool=False, trace_latency:bool=False):
         """
         Instantiate this class to build an instance of the app.
 
-        Accepts 2 arguments:
+        Accepts 5 arguments:
         - `commands_path` (required): a str path to a JSON file containing the commands (must adhere to proper command data syntax)
         - `user_func_map` (optional): a dictionary containing string references to any python functions which the commands may reference
+        - `ui` (optional): the UI backend to use, which must be an instance of a `BaseUI` subclass (such as `HeadlessUI`, 
+        to run the app in servers, workers, or tests). By default, the tkinter GUI (with voice input and output) is used
+        - `use_command_cache` (optional): whether or not to store the loaded commands and their indices in a cache file next to 
+        `commands_path`, and load them from it on later starts (as long as the command file and function names haven't changed). 
+        Off by default, as the cache file is unpickled, so only turn it on if no one else can write to the command file's directory
+        - `trace_latency` (optional): whether or not to time each stage that every input goes through in the main loop (see `latency_tracer`). 
+        The stats are available with the "STATS" action function, and are dumped to `latency_stats_path` (if set) every `latency_stats_interval` seconds
 
         This class also adds on to the user_func_map with exposure to methods with access to the internal parts app, such as the UI,
         as well as access to external processes (via python's subprocess module).
 
-        Start the app with `run()` method
+        While running, the app watches `commands_path`, and reloads the commands whenever it's modified (see `reload_commands()`).
+
+        Start the app with `run()` method (or with `start()` to not block the calling thread, if the UI doesn't need the main thread)
         """
         #-- UI --#
-        self._UI = tkTextBoxGUI("Universal Controller")                                 # the main user interface object
+        if ui is None:
+            from .GUI_audio_voice.GUI_tk import tkTextBoxGUI                            # (only imported when used, as it requires a display and audio devices)
+            ui = tkTextBoxGUI("Universal Controller")
+        assert isinstance(ui, BaseUI)
+        self._UI = ui                                                                   # the main user interface object
         #-- State --#
-        self._active = False                                                            # keeps track of whether or not to keep running main loop
+        self.active = False                                                             # keeps track of whether or not to keep running main loop
+        self._wakeup = Condition()                                                      # notified whenever there's new input, a state change, or shutdown (wakes up the main loop)
+        self._state_changed = False                                                     # set by `notify_state_change()`, and cleared once the main loop has woken up
+        self.preq_poll_interval = 0.1                                                   # seconds between re-checking pre requirements when nothing wakes up the main loop (only if there are pre-requirement-only commands)
+        self.transcription_confidence = 0.9                                             # the min confidence of every word of a first voice transcription to skip (or narrow) its second transcription (set to None to never skip it)
+        self.commands_reload_interval = 1.0                                             # seconds between checking if the command file was modified (set to None to never reload it)
+        self._stopped = Event()                                                         # set on shutdown (stops the command file watcher)
+        self._UI.set_input_callback(self._wake_main_loop)                               # wake up the main loop whenever the UI receives input
+        #-- Latency Tracing --#
+        self.latency_tracer = LatencyTracer(enabled=trace_latency)                      # times the stages of every input (does nothing if disabled)
+        self.latency_stats_path = None                                                  # a JSON file path to periodically dump the latency stats to (set to None to never dump them)
+        self.latency_stats_interval = 60.0                                              # seconds between dumping the latency stats
 
         #-- Action Function Map --#
         self.func_map = {                                                               # an initial map of string references to all internal command action methods
@@ -46,21 +120,25 @@ class App():
             "SAY":          self.say,
             "IS_SPEAKING":  self._UI.is_listening,
             "DISMISS":      self.dismiss,
-            "RUN":          self.proc_run
+            "RUN":          self.proc_run,
+            "STATE_CHANGED":self.notify_state_change,
+            "STATS":        self.latency_tracer.get_stats_text
         }
         if user_func_map:
             self.func_map.update(user_func_map)                                         # if a user function map arg is provided, add it to the func_map
-        #-- Commands and Command Indices --#
-        self._commands = com_loader.load_commands(commands_path, self.func_map)         # load command data, ensure that they're valid, convert to internally usable command dict
-        self._preq_only_commands = com_proc.get_pre_req_only_coms(self._commands)       # get all commands which have only pre requirements and no input requirements
-        self._input_only_commands = com_proc.get_input_req_only_coms(self._commands)    # get all commands which have only input requirements and no pre requirements
-        # Command Vocab/Token Indices #
-        self._vocab_to_com = com_proc.get_input_req_vocab_index(self._commands)         # generate a vocab-to-command-name index 
-        self._com_to_unique_vocab = com_proc.get_unique_input_vocab_map(self._commands) # generate an index of each command's most unique input requirement's vocabulary
-        self._com_to_all_vocab = com_proc.get_full_input_vocab_map(self._commands)      # generate an index of each command's vocabulary for all input requirements
-        self._unique_vocab_list = list(flatten_generator(self._com_to_unique_vocab.values()))   # generate a list of the most unique vocabulary
         #-- Internal General Vocabulary --#
         self._general_vocab = ['quote', 'unquote']                                      # a list of general words which should be used as transcription vocabulary with most commands, regardless of their input requirements
+        #-- Commands and Command Indices --#
+        self._commands_path = commands_path
+        self._commands_file_stat = self._get_commands_file_stat()                       # used to tell when the command file has been modified
+        commands, unbound_commands, indices = com_cache.load_cached_commands(commands_path, self.func_map, use_command_cache)  # load command data, ensure that they're valid, convert to internally usable command dict, and index them (or load all of it from the cache)
+        self._command_index = CommandIndex(unbound_commands, indices)                   # the vocab indices of the commands, which are updated incrementally when the commands are reloaded
+        self._compiled = _CompiledCommands(commands, self._command_index, self._general_vocab)     # the commands and everything compiled from them (replaced as a whole when the commands are reloaded)
+        self._reload_lock = Lock()                                                      # makes sure that the commands are only reloaded by one thread at a time
+        #-- Command Action Executor --#
+        self._executor = ActionExecutor(on_action_done=self._on_action_done)            # runs command actions on a bounded pool of threads
+        self._speculative_executor = ThreadPoolExecutor(max_workers=1)                  # runs full vocabulary transcriptions which might be needed for OPEN requirements, one at a time
+        self._speculative_open = None                                                   # the future of the last speculative transcription (only used by the main loop thread)
 
     #-------- Internal Command Action Methods --------#
 
@@ -69,8 +147,20 @@ class App():
     def shutdown(self):
         """Shutdown app"""
         self.active = False
+        self._stopped.set()
+        self._wake_main_loop()
+        self._executor.shutdown()
+        self._speculative_executor.shutdown(wait=False, cancel_futures=True)
         self._UI.stop()
 
+    def notify_state_change(self):
+        """Wake up the main loop to re-check command pre requirements. Call this whenever anything that 
+        pre-requirement-only commands depend on has changed, so that they don't have to wait to be re-checked"""
+        self._compiled.preq_checker.state_changed()
+        with self._wakeup:
+            self._state_changed = True
+            self._wakeup.notify_all()
+
     #-- UI methods --#
 
     def say(self, *message):
@@ -106,84 +196,269 @@ class App():
 
     def _print_command_properties(self):
         if DEBUG_PRINT:
-            debug_pprint(self._commands, title="Commands")
-            debug_pprint(self._preq_only_commands, title="Pre-Requirement Only Commands")
-            debug_pprint(self._input_only_commands, title="Input-Requirement Only Commands")
-            debug_pprint(self._vocab_to_com, title="Vocab to Command-Name Index")
-            debug_pprint(self._com_to_unique_vocab, title="Command-Name to Unique Input Requirement Vocabulary Index")
-            debug_pprint(self._unique_vocab_list, title="List of Unique Vocabulary")
-            debug_pprint(self._com_to_all_vocab, title="Command-Name to All Input Requirement Vocabulary Index")
+            compiled = self._compiled
+            debug_pprint(compiled.commands, title="Commands")
+            debug_pprint(compiled.preq_only_commands, title="Pre-Requirement Only Commands")
+            debug_pprint(compiled.input_only_commands, title="Input-Requirement Only Commands")
+            debug_pprint(self._command_index.vocab_to_com, title="Vocab to Command-Name Index")
+            debug_pprint(compiled.com_to_unique_vocab, title="Command-Name to Unique Input Requirement Vocabulary Index")
+            debug_pprint(compiled.unique_vocab_list, title="List of Unique Vocabulary")
+            debug_pprint(compiled.com_to_all_vocab, title="Command-Name to All Input Requirement Vocabulary Index")
+            debug_pprint({name: data["exec"] for name, data in compiled.commands.items()}, title="Command-Name to Action Execution Settings (max concurrent, when busy)")
             print('\n' + '-'*60 + '\n' + '-'*60 + '\n')
 
+    #-------- Command Reloading Methods --------#
+
+    def _get_commands_file_stat(self) -> tuple|None:
+        try:
+            file_stat = stat(self._commands_path)
+            return (file_stat.st_mtime_ns, file_stat.st_size)
+        except OSError:
+            return None
+
+    def _watch_commands_file(self):
+        """Reload the commands whenever the command file has been modified (checks every `commands_reload_interval` seconds)"""
+        while not self._stopped.wait(self.commands_reload_interval):
+            file_stat = self._get_commands_file_stat()
+            if file_stat == self._commands_file_stat or file_stat is None:
+                continue
+            self._commands_file_stat = file_stat
+            try:
+                added, removed, changed = self.reload_commands()
+                debug_pprint({"added": added, "removed": removed, "changed": changed}, title="Commands Reloaded")
+            except Exception as e:                      # (if the modified file is invalid, just keep using the current commands)
+                debug_pprint(f"{type(e).__name__}: {e}", title="COMMAND RELOAD FAILED")
+
+    def reload_commands(self) -> tuple[list, list, list]:
+        """Reload the command file, and swap the new commands into the running app. Only the commands which were added, changed, or removed 
+        are converted and re-indexed, and the swap happens all at once, in between main loop cycles. If the command file is invalid (or anything 
+        else fails), the error is raised and the current commands and index are kept as they were, so the next reload tries the same changes again.
+        Returns a tuple of the names of the (added, removed, changed) commands"""
+        with self._reload_lock:
+            unbound_commands = com_loader.load_unbound_commands(self._commands_path, self.func_map)
+            command_index = self._command_index.copy()     # (the current index is only replaced once everything has been built from the new one)
+            added, removed, changed = command_index.update(unbound_commands)
+            if added or removed or changed:
+                current_commands = self._compiled.commands
+                new_commands = com_loader.bind_commands({name:unbound_commands[name] for name in added + changed}, self.func_map)
+                commands = {name:new_commands[name] if name in new_commands else current_commands[name] for name in unbound_commands}
+                compiled = _CompiledCommands(commands, command_index, self._general_vocab)
+                self._command_index = command_index
+                self._compiled = compiled                   # (swapped in with a single assignment)
+                self._wake_main_loop()
+            return added, removed, changed
+
+    #-------- Latency Stats Methods --------#
+
+    def _dump_latency_stats(self):
+        """Dump the latency stats to `latency_stats_path` every `latency_stats_interval` seconds (and once more on shutdown)"""
+        while not self._stopped.wait(self.latency_stats_interval):
+            self.latency_tracer.dump(self.latency_stats_path)
+        self.latency_tracer.dump(self.latency_stats_path)
+
+    #-------- Batch Processing Methods --------#
+
+    def resolve_batch(self, texts:list, run_actions:bool=False) -> list:
+        """Resolve many text inputs together, without going through the UI or the main loop (ex: for replaying logs of typed commands).
+        Returns a list with a `(command name, input requirement values)` tuple for each text, in the same order. 
+        If no command is met by a text, its tuple is `(None, [])`.
+
+        Pre requirements are only checked once for the whole batch, and identical texts are only resolved once.
+        If `run_actions` is True, the action of each met command is also submitted to the executor (in the order of `texts`). Whenever the 
+        executor's queue is full, this waits for room in it, so that no actions of a large batch are rejected for it (must not be called from an action)"""
+        compiled = self._compiled
+        commands = compiled.preq_checker.get_preq_met_commands()
+        commands.update(compiled.input_only_commands)
+        analyses = {text: None for text in texts}                   # each distinct text -> its input analysis
+        for text in analyses:
+            analyses[text] = input_proc.InputAnalysis(text)
+        batch_scores = compiled.vocab_matrix.get_batch_overlap_scores([analysis.tokens for analysis in analyses.values()])
+        resolved = {}                                               # each distinct text -> (command name, input requirement values)
+        for (text, analysis), scores in zip(analyses.items(), batch_scores):
+            possible_commands = {name:commands[name] for name in scores if name in commands}
+            resolved[text] = compiled.matcher.match(analysis, text, None, possible_commands) if possible_commands else (None, [])
+        results = []
+        for text in texts:
+            name, input_req_values = resolved[text]
+            input_req_values = list(input_req_values)               # (so that results of identical texts don't share a list)
+            if run_actions and name:
+                command = commands[name]
+                if not self._executor.submit(name, command["action"], (input_req_values,), command["exec"], wait=True):
+                    debug_pprint(f'"{name}" action was rejected', title='ACTION REJECTED')
+            results.append((name, input_req_values))
+        return results
+
     #-------- Main Run Methods --------#
 
+    def _on_action_done(self):
+        self._compiled.preq_checker.state_changed()     # discard any state-dependent cached pre requirement values, as the action may have changed state
+
+    def _wake_main_loop(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _wait_for_wakeup(self):
+        """Block until there's any input, a state change, or shutdown. If there are any pre-requirement-only commands, 
+        this will also return after `preq_poll_interval` seconds, as their pre requirements can change without notice."""
+        timeout = self.preq_poll_interval if self._compiled.preq_only_commands else None
+        with self._wakeup:                              # (the UI must acquire the same lock to notify, so no input can arrive unnoticed between checking and waiting)
+            if self.active and not self._state_changed and not self._UI.has_input():
+                self._wakeup.wait(timeout)
+            self._state_changed = False
+
+    def _is_transcription_confident(self, transcription:str) -> bool:
+        """Check if the confidence of every word in a transcription is at least `transcription_confidence` (if the UI provides word confidences)"""
+        confidence = getattr(transcription, "confidence", None)
+        return self.transcription_confidence is not None and confidence is not None and confidence >= self.transcription_confidence
+
+    def _run_command_action(self, command_name:str, commands:dict, input_req_values:list):
+        debug_pprint(f'now executing "{command_name}"', title='COMMAND MET')
+        command = commands.get(command_name)
+        if not self._executor.submit(command_name, command["action"], (input_req_values,), command["exec"]):   # run the command action on the executor
+            debug_pprint(f'"{command_name}" action was rejected', title='ACTION REJECTED')
+
     def _main_loop(self):
         current_input = None
-        last_preq_met_commands = {}                     # this is just for debug print
+        last_preq_met_commands = {}                     # used for debug print, and to tell when the vocabulary hint has to be updated
+        last_hint_compiled = None                       # the compiled commands that the vocabulary hint was last updated for
+        early_matched_phrase_ids = deque(maxlen=8)      # the ids of the last voice phrases which met a command before they were done being captured
 
         while self.active:
-            sleep(0.01)
+            self._wait_for_wakeup()                     # (instead of polling, only continue once there's something to do)
+            if not self.active:
+                break
+            compiled = self._compiled                   # (the commands can be reloaded at any time, so the same ones are used for this entire cycle)
+            trace = self.latency_tracer.start_trace()   # (only recorded once there's input or a met pre-requirement-only command)
             # (0) isolate only commands which have their initial pre requirements met
-            commands = com_proc.get_preq_met_commands(self._commands)
+            commands = compiled.preq_checker.get_preq_met_commands()
             if commands != last_preq_met_commands:
                 debug_pprint(commands, title="0) Initial Commands with *Met Pre-Reqs*")
-                last_preq_met_commands = commands
+                last_preq_met_commands = dict(commands) # (a copy, as `commands` is added to below)
+                last_hint_compiled = None
+            if compiled is not last_hint_compiled:      # hint the UI with the vocabulary of step 3a, so that it can start transcribing voice input while it's captured
+                self._UI.set_vocab_hint(compiled.get_unique_vocab({**commands, **compiled.input_only_commands}))
+                last_hint_compiled = compiled
             # (1) if there's any preq-only/non-input commands, check if their pre-requirements are met
             met_command_name = None
-            if self._preq_only_commands and commands:
+            if compiled.preq_only_commands and commands:
                 for name, data in commands.items():
-                    if name in self._preq_only_commands.keys():
+                    if name in compiled.preq_only_commands.keys():
             # (1a) if any are fully met, use the first one, and skip to the command action execution step. otherwise check for input instead
                         met_command_name = name
                         break
+            trace.mark("preq_check")
             if not met_command_name:
             # (2) get input
                 user_input = self._UI.get_input()       # non-blocking
                 if not user_input:
-                    continue                            # if no input is available, continue to the next loop cycle
+                    continue                            # if no input is available, go back to waiting
                 debug_pprint("INPUT GOT", title='_')
                 input_type, input_data = user_input
                 input_text = input_data
             # (3) further add commands don't have any pre-requirements at all
-                commands.update(self._input_only_commands)
+                commands.update(compiled.input_only_commands)
                 if not commands:                        # continue on to the next loop cycle if at any point, `commands` is empty
+                    trace.finish()
                     continue
                 debug_pprint(commands, title="1)Commands with *Met Pre-Reqs* or *No Pre-Reqs*")
+            # (3-) if the input is the partial transcription of a voice phrase which is still being captured, check if it already meets a command 
+            # which more input can't change. If it does, run its action right away, and discard the rest of the phrase
+                if input_type == "VOICE_PARTIAL":
+                    phrase_id, input_text = input_data
+                    if phrase_id in early_matched_phrase_ids:
+                        continue
+                    met_command_name, input_req_values = compiled.matcher.match_prefix(input_text, commands)
+                    trace.mark("early_matching")
+                    if not met_command_name:
+                        continue                        # (partial transcriptions which don't meet a command aren't traced)
+                    early_matched_phrase_ids.append(phrase_id)
+                    self._UI.discard_voice_phrase(phrase_id)
+                    self._UI.mainview_append(f'"{input_text}"', 'right')
+                    debug_pprint(f'"{input_text}"', title='User Input Partial Text')
+                    self._run_command_action(met_command_name, commands, input_req_values)
+                    trace.mark("action_dispatch")
+                    trace.finish(met_command_name)
+                    continue
             # (3a) if the input type is voice, then update input_text with an initial transcription using the most unique vocabulary of each command.
             # this way, the smallest possible vocabulary can be used to check for all commands (smaller vocab == faster more accurate transcription!)
                 if input_type == "VOICE":
-                    unique_vocab = list(flatten_generator([self._com_to_unique_vocab.get(name) for name in commands.keys()]))
-                    input_text = self._UI.transcribe_audio(input_data, unique_vocab + self._general_vocab)
+                    if early_matched_phrase_ids and self._UI.get_voice_phrase_id(input_data) in early_matched_phrase_ids:
+                        continue                        # (the phrase already met a command while captured, but was stored as input before it could be discarded)
+                    input_text = self._UI.transcribe_audio(input_data, compiled.get_unique_vocab(commands))
+                    trace.mark("transcription_1")
                 if not input_text:
+                    trace.finish()
                     continue
             # (3b) output user input text
                 self._UI.mainview_append(f'"{input_text}"', 'right')
                 debug_pprint(f'"{input_text}"', title='User Input Text 1')
             # (4) split input_text into inidividual tokens (words)
-                input_tokens, input_quotes = input_proc.get_basic_tokens_and_quote_sections(input_text)
+                input_analysis = input_proc.InputAnalysis(input_text)  # (tokens, quotes, numbers, and durations are computed once here, and shared with step 6)
+                input_tokens = input_analysis.tokens
+                trace.mark("tokenization")
                 debug_pprint(input_tokens, title='User Input Text Basic Tokens')
             # (5) further filter the possible commands, by including only those which their most unique vocabulary overlap with input_tokens
-                possible_commands_names = list(flatten_generator([self._vocab_to_com.get(token) for token in input_tokens if token in self._unique_vocab_list]))
+                possible_commands_names = compiled.vocab_matrix.get_overlap_scores(input_tokens)
                 commands = {name:commands.get(name) for name in possible_commands_names if commands.get(name)}  # exclude any commands which aren't in current `commands` dict
+                trace.mark("candidate_filtering")
                 if not commands:
+                    trace.finish()
                     continue
                 debug_pprint(commands, title="2) Possible Commands (com's unique vocab is in input tokens)")
-            # (5a) if the input type is voice, then update input_text again with a second transcription using the vocabulary of only the possible commands
-                if input_type == "VOICE":
-                    full_vocab = list(flatten_generator([self._com_to_all_vocab.get(name) for name in commands.keys()]))
-                    input_text = self._UI.transcribe_audio(input_data, full_vocab + self._general_vocab)
+            # (5-) if the input type is voice, and any of the possible commands have an OPEN requirement, then start the full vocabulary transcription
+            # that its value needs right away, instead of once the command is met in step 6, so that it runs in parallel with the steps in between.
+            # if it isn't needed after all, it's cancelled (or if it's already running, its result is just discarded). while a discarded one is 
+            # still running, speculation is skipped (so the OPEN value is transcribed directly, if it's needed), as it would only queue up behind it
+                speculative_open = None
+                transcribe_open = self._UI.transcribe_audio
+                if input_type == "VOICE" and not compiled.open_req_commands.keys().isdisjoint(commands) and (self._speculative_open is None or self._speculative_open.done()):
+                    speculative_open = self._speculative_open = self._speculative_executor.submit(self._UI.transcribe_audio, input_data)
+                    transcribe_open = lambda audio: speculative_open.result()
+                transcribe_open = trace.wrap(transcribe_open, "open_transcription", "matching")     # (re-transcribing OPEN requirements is timed separately from matching)
+                met_command_name, input_req_values = None, []
+            # (5a) if the input type is voice, and every word of the first transcription is confident (and none are unknown), then it's checked 
+            # for a met command right away. if it has one, the second transcription is skipped. otherwise, only the possible commands which 
+            # overlap the most with it are used for the second transcription's vocabulary
+                if input_type == "VOICE" and self._is_transcription_confident(input_text):
+                    met_command_name, input_req_values = compiled.matcher.match(input_analysis, input_data, transcribe_open, commands)
+                    trace.mark("matching")
+                    if not met_command_name:
+                        best_score = max(possible_commands_names[name] for name in commands)
+                        commands = {name:data for name, data in commands.items() if possible_commands_names[name] == best_score}
+                        debug_pprint(commands, title="2a) Best Possible Commands (confident first transcription)")
+            # (5b) if the input type is voice, then update input_text again with a second transcription using the vocabulary of only the possible commands
+                if input_type == "VOICE" and not met_command_name:
+                    input_text = self._UI.transcribe_audio(input_data, compiled.get_full_vocab(commands))
+                    trace.mark("transcription_2")
+                    input_analysis = input_proc.InputAnalysis(input_text)
+                    trace.mark("tokenization")
                     self._UI.mainview_append(f'"{input_text}"', 'right')
                     debug_pprint(f'"{input_text}"', title='User Input Text 2')
             # (6) now check each of the possible command's input requirements, and see if any have all of them met
-                met_command_name, input_req_values = com_proc.get_commands_matching_input_reqs(input_text, input_data, commands, self._UI.transcribe_audio)
+                if not met_command_name:
+                    met_command_name, input_req_values = compiled.matcher.match(input_analysis, input_data, transcribe_open, commands)
+                    trace.mark("matching")
+                if speculative_open and met_command_name not in compiled.open_req_commands:
+                    speculative_open.cancel()
             # (7) if a command is fully met, call its action function, passing in the matched input requirement values
             if met_command_name:
-                debug_pprint(f'now executing "{met_command_name}"', title='COMMAND MET')
-                action_func = commands.get(met_command_name)["action"]                      # get the action function
-                Thread(target=action_func, args=(input_req_values,), daemon=True).start()   # run the command action in a new thread
+                self._run_command_action(met_command_name, commands, input_req_values)
+                trace.mark("action_dispatch")
+            trace.finish(met_command_name)
 
-    def run(self):
+    def start(self):
+        """Start the main loop in a new thread, and return without running the UI"""
         self._print_command_properties()                        # print out initial command properties (if `DEBUG_PRINT` is True)
+        debug_pprint(self._UI.get_startup_times(), title="UI Startup Times (seconds)")
+        self._UI.set_startup_callback(lambda name, seconds: debug_pprint({name: seconds}, title="UI Component Loaded (seconds)"))    # (components which load in the background are reported once they're loaded)
         self.active = True                                      # set `active` to True
         Thread(target=self._main_loop, daemon=True).start()     # start main_loop in new thread
+        if self.commands_reload_interval:
+            Thread(target=self._watch_commands_file, daemon=True).start()   # start watching the command file for modifications
+        if self.latency_tracer.enabled and self.latency_stats_path:
+            Thread(target=self._dump_latency_stats, daemon=True).start()    # start periodically dumping the latency stats
+
+    def run(self):
+        """Start the main loop, and then run the UI (blocks until shutdown)"""
+        self.start()
         self._UI.run()                                          # start UI
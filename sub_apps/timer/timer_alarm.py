@@ -3,8 +3,6 @@ from os.path import dirname, join
 #sys.path.append(dirname(__file__))
 from threading import Event
 from io import BytesIO
-from pyaudio import PyAudio, paInt16
-import pyttsx4
 from ._timer_class import SimpleTimer
 
 def _generate_alarm_audio_file(message:str=None):
@@ -16,6 +14,7 @@ def _generate_alarm_audio_file(message:str=None):
     with open(DEFAULT_SOUND, 'rb') as s:
         data = s.read()                         # get audio data from DEFAULT_SOUND
     if message:                                 # if message was provided, add tts audio of the message to data
+        import pyttsx4                          # (only imported when needed, as it's slow to import)
         engine = pyttsx4.init()
         engine.save_to_file(message, b_file)
         engine.runAndWait()
@@ -29,6 +28,7 @@ def _generate_alarm_audio_file(message:str=None):
     return b_file
 
 def _generate_timer_func(message:str=None):
+    from pyaudio import PyAudio, paInt16        # (only imported when a timer is made, as it's slow to import)
     pa = PyAudio()
     alarm_file = _generate_alarm_audio_file(message)
     NBYTES = len(alarm_file.getbuffer())
@@ -0,0 +1,226 @@
+"""
+Micro-benchmarks of the command loading, indexing, and matching paths, using synthetic command catalogs.
+
+Run standalone (`python tests/benchmarks.py --help` for options). Results are written as JSON, and compared against 
+a stored baseline (`benchmark_baseline.json`): any benchmark which takes more than `threshold` times as long as its baseline 
+is reported as a regression. As the baseline was recorded on one machine, the pytest entry point (`pytest tests/benchmarks.py`) 
+is skipped unless the `RUN_BENCHMARKS` environment variable is set.
+"""
+
+import sys
+import json
+import argparse
+from os import path, environ
+from os.path import dirname, join
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+sys.path.append(dirname(dirname(path.abspath(__file__))))
+
+from app.input_command_processing import command_data_loader, command_processing, input_string_processing as input_proc
+from app.input_command_processing.vocab_matrix import CommandVocabMatrix
+
+#------
+
+BASELINE_FILEPATH = join(dirname(path.abspath(__file__)), "benchmark_baseline.json")
+RESULTS_FILEPATH = join(dirname(path.abspath(__file__)), "benchmark_results.json")
+
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_THRESHOLD = 1.5
+SCALING_SIZES = (100, 1000, 10000, 100000)
+MAX_SCALING_RATIO = 3.0         # the max allowed ratio of the per-command build time of the largest catalog to that of the smallest one
+MIN_TIME = 0.00001              # any times below this (in seconds) are treated as this when comparing, as they're mostly noise
+
+BENCH_FUNC_MAP = {
+    'SAY':      lambda *args: None,
+    'IS_ON':    lambda: True
+}
+
+#-------- Synthetic Command Catalogs --------#
+
+def generate_command_data(n_commands:int) -> dict:
+    """Generate the JSON data of a command catalog with `n_commands` commands, cycling through a mix of all input requirement types:
+    STRING, ANY (aliases), ORDERED (phrases), NUMBER, DURATION, and OPEN. Every command has its own unique word (`w<i>`)"""
+    aliases = {
+        "verb":     ["<ANY>", "start", "set", "make", "create", "do"],
+        "polite":   ["<ANY>", "please", "kindly", "could you"]
+    }
+    input_templates = (
+        lambda i: [f"w{i}", "^verb"],                                       # STRING + ANY alias
+        lambda i: [f"turn w{i} on"],                                        # ORDERED phrase
+        lambda i: [f"w{i}", "<#>1-100"],                                    # NUMBER
+        lambda i: [f"w{i}", "timer", "<D>1-360000"],                        # DURATION
+        lambda i: [f"w{i}", "note", "<_>"],                                 # OPEN
+        lambda i: ["^polite", ["<ALL>", f"w{i}", "status"]]                 # ANY alias + ALL
+    )
+    commands = {}
+    for i in range(n_commands):
+        commands[f"Command {i}"] = {
+            "preqs": [["IS_ON", True]] if i % 10 == 9 else [],
+            "input": input_templates[i % len(input_templates)](i),
+            "actns": [["SAY", "^I0"]]
+        }
+    return {"aliases": aliases, "commands": commands}
+
+def generate_inputs(n_commands:int) -> list:
+    """Generate input texts which match the last commands of a catalog (the worst case for matching in command order), and one which matches none"""
+    inputs = (
+        lambda i: f"could you start w{i}",
+        lambda i: f"turn w{i} on now",
+        lambda i: f"w{i} forty two",
+        lambda i: f"w{i} timer for two hours and five minutes",
+        lambda i: f'w{i} note "buy some milk"',
+        lambda i: f"please what is the w{i} status"
+    )
+    last = max(n_commands - len(inputs), 0)
+    return [inputs[i % len(inputs)](i) for i in range(last, n_commands)] + ["nothing to see here"]
+
+#-------- Timing --------#
+
+def _time(func, *args, repeat:int=5) -> float:
+    """Get the best time (in seconds) of `repeat` calls of `func`"""
+    times = []
+    for i in range(repeat):
+        start = perf_counter()
+        func(*args)
+        times.append(perf_counter() - start)
+    return min(times)
+
+def _time_each(func, inputs:list, repeat:int=5) -> float:
+    """Get the best time (in seconds) of calling `func` once for each input (as the only arg) in `inputs`, divided by the number of inputs"""
+    return _time(lambda: [func(x) for x in inputs], repeat=repeat) / len(inputs)
+
+def run_benchmarks(sizes:tuple=DEFAULT_SIZES) -> dict:
+    """Run all benchmarks with a synthetic catalog of each size, and return a dict of each benchmark name (`<path>[<size>]`) and its time in seconds.
+    Per-input paths (tokenizing, duration conversion, and matching) are timed per input"""
+    results = {}
+    for n in sizes:
+        repeat = 5 if n <= 1000 else 1
+        inputs = generate_inputs(n)
+        with TemporaryDirectory() as temp_dir:
+            commands_path = join(temp_dir, "commands.json")
+            with open(commands_path, 'w') as coms:
+                json.dump(generate_command_data(n), coms)
+            results[f"load_commands[{n}]"] = _time(command_data_loader.load_commands, commands_path, BENCH_FUNC_MAP, repeat=repeat)
+            commands = command_data_loader.load_commands(commands_path, BENCH_FUNC_MAP)
+        # index builders:
+        results[f"get_input_req_vocab_index[{n}]"] = _time(command_processing.get_input_req_vocab_index, commands, repeat=repeat)
+        results[f"get_unique_input_vocab_map[{n}]"] = _time(command_processing.get_unique_input_vocab_map, commands, repeat=repeat)
+        results[f"get_full_input_vocab_map[{n}]"] = _time(command_processing.get_full_input_vocab_map, commands, repeat=repeat)
+        results[f"build_input_vocab_indices[{n}]"] = _time(command_processing.build_input_vocab_indices, commands, repeat=repeat)
+        results[f"CommandMatcher[{n}]"] = _time(command_processing.CommandMatcher, commands, repeat=repeat)
+        vocab_to_com, com_to_unique_vocab, com_to_all_vocab = command_processing.build_input_vocab_indices(commands)
+        unique_vocab = [v for vocab in com_to_unique_vocab.values() for v in vocab]
+        results[f"CommandVocabMatrix[{n}]"] = _time(CommandVocabMatrix, vocab_to_com, list(commands), unique_vocab, repeat=repeat)
+        # input processing:
+        tokens = [input_proc.get_basic_tokens_and_quote_sections(text)[0] for text in inputs]
+        results[f"get_basic_tokens_and_quote_sections[{n}]"] = _time_each(input_proc.get_basic_tokens_and_quote_sections, inputs)
+        results[f"convert_words_to_durations[{n}]"] = _time_each(input_proc.convert_words_to_durations, tokens)
+        # matching:
+        matcher = command_processing.CommandMatcher(commands)
+        results[f"get_commands_matching_input_reqs[{n}]"] = _time_each(lambda text: command_processing.get_commands_matching_input_reqs(text, text, commands, None), inputs, repeat=repeat)
+        results[f"CommandMatcher.match[{n}]"] = _time_each(lambda text: matcher.match(text, text, None), inputs, repeat=repeat)
+    return results
+
+def run_scaling_check(sizes:tuple=SCALING_SIZES) -> dict:
+    """Time `build_input_vocab_indices()` with a synthetic catalog of each size, and return a dict of each size and its time per command (in seconds).
+    As the build is linear in the number of commands, the time per command should stay about the same as the catalog grows"""
+    per_command = {}
+    for n in sizes:
+        with TemporaryDirectory() as temp_dir:
+            commands_path = join(temp_dir, "commands.json")
+            with open(commands_path, 'w') as coms:
+                json.dump(generate_command_data(n), coms)
+            commands = command_data_loader.load_commands(commands_path, BENCH_FUNC_MAP)
+        per_command[n] = _time(command_processing.build_input_vocab_indices, commands, repeat=5 if n <= 1000 else 1) / n
+    return per_command
+
+def get_scaling_ratio(per_command:dict) -> float:
+    """Get the ratio of the per-command time of the largest size to that of the smallest size"""
+    return per_command[max(per_command)] / per_command[min(per_command)]
+
+#-------- Results and Baseline --------#
+
+def save_results(results:dict, filepath:str):
+    with open(filepath, 'w') as file:
+        json.dump(results, file, indent=4)
+
+def load_results(filepath:str) -> dict:
+    with open(filepath, 'r') as file:
+        return json.load(file)
+
+def compare_to_baseline(results:dict, baseline:dict, threshold:float=DEFAULT_THRESHOLD) -> list:
+    """Get a list of (benchmark name, baseline time, result time, ratio) tuples of all benchmarks which took more than 
+    `threshold` times as long as their baseline. Benchmarks which aren't in the baseline are skipped"""
+    regressions = []
+    for name, result_time in results.items():
+        if name not in baseline:
+            continue
+        ratio = max(result_time, MIN_TIME) / max(baseline[name], MIN_TIME)
+        if ratio > threshold:
+            regressions.append((name, baseline[name], result_time, ratio))
+    return regressions
+
+def print_results(results:dict, baseline:dict=None):
+    baseline = baseline or {}
+    print(f"\n{'benchmark':<50}{'time (ms)':>14}{'baseline (ms)':>16}{'ratio':>10}")
+    for name, result_time in results.items():
+        if name in baseline:
+            ratio = max(result_time, MIN_TIME) / max(baseline[name], MIN_TIME)
+            print(f"{name:<50}{result_time*1000:>14.4f}{baseline[name]*1000:>16.4f}{ratio:>10.2f}")
+        else:
+            print(f"{name:<50}{result_time*1000:>14.4f}{'-':>16}{'-':>10}")
+
+#-------- pytest Entry Point --------#
+
+def test_benchmarks():
+    if not environ.get("RUN_BENCHMARKS"):
+        import pytest
+        pytest.skip("the baseline times are machine-specific, set RUN_BENCHMARKS=1 to compare against them")
+    # (only the smaller catalogs, to keep the test suite fast; run this file standalone for the full sizes and to save results)
+    results = run_benchmarks((10, 1000))
+    if path.exists(BASELINE_FILEPATH):
+        regressions = compare_to_baseline(results, load_results(BASELINE_FILEPATH), threshold=3.0)
+        assert not regressions, f"benchmark regressions (name, baseline, result, ratio): {regressions}"
+
+def test_index_build_scaling():
+    if not environ.get("RUN_BENCHMARKS"):
+        import pytest
+        pytest.skip("timing-based, set RUN_BENCHMARKS=1 to run it")
+    per_command = run_scaling_check()
+    ratio = get_scaling_ratio(per_command)
+    assert ratio <= MAX_SCALING_RATIO, f"the per-command index build time grew {ratio:.2f}x from {min(per_command)} to {max(per_command)} commands: {per_command}"
+
+#-------- Standalone Entry Point --------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the command matching micro-benchmarks, and compare them to a baseline")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="the number of commands in each synthetic catalog")
+    parser.add_argument("--output", default=RESULTS_FILEPATH, help="the JSON file to write the results to")
+    parser.add_argument("--baseline", default=BASELINE_FILEPATH, help="the JSON file of baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="the max allowed ratio of result time to baseline time")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline (instead of comparing against it)")
+    parser.add_argument("--scaling", action="store_true", help="only check that the per-command index build time stays flat from 100 to 100k commands")
+    args = parser.parse_args()
+
+    if args.scaling:
+        per_command = run_scaling_check()
+        for n, seconds in per_command.items():
+            print(f"build_input_vocab_indices[{n}]: {seconds*1e6:.3f}us per command")
+        ratio = get_scaling_ratio(per_command)
+        print(f"scaling ratio: {ratio:.2f} (max {MAX_SCALING_RATIO})")
+        sys.exit(1 if ratio > MAX_SCALING_RATIO else 0)
+
+    results = run_benchmarks(args.sizes)
+    save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print_results(results)
+        print(f"\nsaved baseline to {args.baseline}")
+    else:
+        baseline = load_results(args.baseline) if path.exists(args.baseline) else {}
+        print_results(results, baseline)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for name, baseline_time, result_time, ratio in regressions:
+            print(f"REGRESSION: {name} took {ratio:.2f}x as long as its baseline ({result_time*1000:.4f}ms vs {baseline_time*1000:.4f}ms)")
+        sys.exit(1 if regressions else 0)
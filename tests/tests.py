@@ -6,9 +6,12 @@ sys.path.append(dirname(__file__))
 sys.path.append(dirname(dirname(__file__)))
 sys.path.append(join(dirname(dirname(__file__)), "app"))
 
-from app.input_command_processing import command_data_loader, input_string_processing, command_processing
+from app.input_command_processing import command_data_loader, input_string_processing, command_processing, vocab_matrix, command_cache, command_index
 from app.GUI_audio_voice import speech_proc
 from app.input_command_processing import input_string_processing as input_proc
+from app.action_executor import ActionExecutor
+from app.GUI_audio_voice.headless_UI import HeadlessUI
+from app import main as app_main
 
 chdir(path.dirname(__file__))
 
@@ -56,7 +59,82 @@ def test_command_data_loader():
                 except:
                     print(' '*7, val)
     
-    #assert commands == 
+    # the args of each action are compiled into (source, value) pairs, where any references are resolved to an index:
+    unbound_commands = command_data_loader.load_unbound_commands(COMMAND_DATA_FILEPATH, TEST_FUNC_MAP)
+    assert unbound_commands["Start Timer"]["actions"] == [
+        ('START_TIMER', ('^I2',), ((command_data_loader._INPUT_ARG, 2),)),
+        ('SAY', ('timer set for', '^I1', '^I2'), ((command_data_loader._CONSTANT_ARG, 'timer set for'), (command_data_loader._INPUT_ARG, 1), (command_data_loader._INPUT_ARG, 2)))
+    ]
+    assert unbound_commands["Get Time"]["actions"][0] == ('GET_TIME', (), None)     # (no references, so no plan)
+    assert unbound_commands["Get Time"]["actions"][1][2] == ((command_data_loader._CONSTANT_ARG, 'the current time is'), (command_data_loader._ACTION_ARG, 0))
+    # the combined action function resolves the references when called:
+    calls = []
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon", 'SAY': lambda *args: calls.append(args)}
+    command_data_loader.load_commands(COMMAND_DATA_FILEPATH, func_map)["Get Time"]["action"]([])
+    assert calls == [('the current time is', 'noon')]
+    # any reference to an input requirement or action which doesn't exist is caught when loading:
+    from tempfile import TemporaryDirectory
+    import json
+    invalid_actions = (
+        [["SAY", "^I1"]],                   # (only 1 input requirement)
+        [["SAY", "^A0"]],                   # (an action can only refer to the actions before it)
+        ["GET_TIME", ["SAY", "^A1"]],
+        [["SAY", "^Ione"]]                  # (not an index number)
+    )
+    with TemporaryDirectory() as temp_dir:
+        for actions in invalid_actions:
+            commands_path = join(temp_dir, "commands.json")
+            with open(commands_path, 'w') as coms:
+                json.dump({"aliases": {}, "commands": {"Test": {"preqs": [], "input": ["test"], "actns": actions}}}, coms)
+            error = None
+            try:
+                command_data_loader.load_unbound_commands(commands_path, TEST_FUNC_MAP)
+            except AssertionError as e:
+                error = e
+            optional_print('invalid:', error)
+            assert "command is invalid" in str(error)
+
+
+def test_command_cache():
+    from tempfile import TemporaryDirectory
+    from shutil import copy
+    with TemporaryDirectory() as temp_dir:
+        commands_path = copy(COMMAND_DATA_FILEPATH, temp_dir)
+        cache_path = command_cache.get_cache_path(commands_path)
+        key = command_cache.get_cache_key(commands_path, TEST_FUNC_MAP)
+        # the cache is only used once it's turned on (and until then, the command file isn't hashed for its key):
+        get_cache_key = command_cache.get_cache_key
+        command_cache.get_cache_key = None
+        try:
+            command_cache.load_cached_commands(commands_path, TEST_FUNC_MAP)
+        finally:
+            command_cache.get_cache_key = get_cache_key
+        assert not path.exists(cache_path)
+        # first load builds the cache, and the second load uses it:
+        commands_1, unbound_1, indices_1 = command_cache.load_cached_commands(commands_path, TEST_FUNC_MAP, use_cache=True)
+        assert path.exists(cache_path) and command_cache._read_cache(cache_path, key)
+        commands_2, unbound_2, indices_2 = command_cache.load_cached_commands(commands_path, TEST_FUNC_MAP, use_cache=True)
+        optional_print('\n' + '-'*50)
+        optional_print('__' + 'test_command_cache' + '__')
+        optional_print('\ncache size:', path.getsize(cache_path), 'bytes')
+        optional_print('indices:', indices_2)
+        assert indices_1 == indices_2 == command_cache.get_command_indices(commands_1)
+        assert unbound_1 == unbound_2 == command_data_loader.load_unbound_commands(commands_path, TEST_FUNC_MAP)
+        uncached = command_data_loader.load_commands(commands_path, TEST_FUNC_MAP)
+        for commands in (commands_1, commands_2):
+            assert list(commands) == list(uncached)
+            for name, data in commands.items():
+                assert data['preqs'] == uncached[name]['preqs'] and data['input'] == uncached[name]['input'] and data['exec'] == uncached[name]['exec']
+                assert callable(data['action'])
+        # the cache isn't used once either the command file or the func map names change:
+        assert command_cache.get_cache_key(commands_path, {**TEST_FUNC_MAP, 'NEW_FUNC': print}) != key
+        with open(commands_path, 'a') as coms:
+            coms.write(' ')
+        assert command_cache._read_cache(cache_path, command_cache.get_cache_key(commands_path, TEST_FUNC_MAP)) is None
+        # a corrupted cache is ignored:
+        with open(cache_path, 'wb') as cache:
+            cache.write(b'corrupted')
+        assert command_cache.load_cached_commands(commands_path, TEST_FUNC_MAP, use_cache=True)[2] == indices_1
 
 
 #--- Commands to use for further testing ---#
@@ -91,6 +169,22 @@ def test_basic_tokenizer():
         optional_print('\ntokens:', tokens)
         optional_print('quotes:', quotes)
         assert tokens == expected_value
+    # any whitespace separates words, whitespace around a quote is trimmed, and empty quotes are dropped:
+    assert input_proc.get_basic_tokens_and_quote_sections("tab\there\nnew line") == (['tab', 'here', 'new', 'line'], [])
+    assert input_proc.get_basic_tokens_and_quote_sections('say "  hi there " now') == (['say', 'hi there', 'now'], ['hi there'])
+    assert input_proc.get_basic_tokens_and_quote_sections('an "" empty quote') == (['an', 'empty', 'quote'], [])
+
+def test_token_spans():
+    text = """Make a note, quote Buy "oat" milk... unquote and call it "Groceries"! Thanks."""
+    token_spans, quote_spans = input_proc.get_token_and_quote_spans(text)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_token_spans' + '__')
+    optional_print('\ntoken spans:', token_spans)
+    optional_print('quote spans:', quote_spans)
+    assert [t for t, s, e in token_spans] == ['make', 'a', 'note', 'Buy "oat" milk...', 'and', 'call', 'it', 'Groceries', 'thanks']
+    assert [q for q, s, e in quote_spans] == ['Buy "oat" milk...', 'Groceries']
+    for token, start, end in token_spans:
+        assert text[start:end].lower() == token.lower()     # every span must point at its token in the original text
 
 def test_word_to_number_converter():
     input_text_list = [
@@ -161,6 +255,19 @@ def test_word_to_duration_converter():
         assert updated_tokens == expected_new_tokens
         assert original_converted_words == expected_changed_tokens
 
+def test_input_analysis():
+    text = "Please set a timer for two hours and twenty two minutes, and call it quote five alarms unquote."
+    analysis = input_proc.InputAnalysis(text)
+    tokens, quotes = input_proc.get_basic_tokens_and_quote_sections(text)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_input_analysis' + '__')
+    optional_print('\nnumbers:  ', analysis.numbers)
+    optional_print('durations:', analysis.durations)
+    assert (analysis.tokens, analysis.quotes) == (tokens, quotes)
+    assert analysis.durations == input_proc.convert_words_to_durations(tokens)
+    assert analysis.numbers == input_proc.convert_words_to_numbers(tokens)     # must not be changed by computing durations from it
+    assert analysis.numbers is analysis.numbers
+
 
 #-------- `command_processing` tests --------#
 
@@ -171,6 +278,54 @@ def test_unique_vocab_generator():
     for name, vocab in unique_vocab_map.items():
         optional_print('\n', name, '\n', vocab)
 
+def test_index_builder():
+    # (the speed of the single pass builder is measured in `benchmarks.py`, here its output is checked against the per-command functions)
+    from collections import Counter
+    test_commands = {f"Command {i}": {"preqs": [], "input": [
+        ('STRING', f"name{i % 7}", None),
+        ('ANY', [('STRING', "go", None), ('STRING', f"word{i % 5}", None)], None),
+        ('ORDERED', [('STRING', "please", None), ('STRING', f"verb{i % 3}", None)], None),
+        ('NUMBER', None, None)
+    ]} for i in range(30)}
+    test_commands["Say Thanks"] = {"preqs": [], "input": [('ANY', [('STRING', "thank you", None), ('STRING', "thanks", None)], None)]}
+    test_commands["Number Only"] = {"preqs": [], "input": [('NUMBER', None, None)]}
+    test_commands["Open Only"] = {"preqs": [], "input": [('OPEN', None, None)]}
+    test_commands.update(commands)
+    vocab_to_com, com_to_unique_vocab, com_to_all_vocab = command_processing.build_input_vocab_indices(test_commands)
+    com_vocab = {name: command_processing.get_command_vocab(data["input"]) for name, data in test_commands.items()}
+    vocab_counts = Counter(token for vocab in com_vocab.values() for token in vocab)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_index_builder' + '__')
+    optional_print('\nunique vocab:', com_to_unique_vocab)
+    assert {token: Counter(names) for token, names in vocab_to_com.items()} == {token: Counter(name for name, vocab in com_vocab.items() for t in vocab if t == token) for token in vocab_counts}
+    assert {name: set(vocab) for name, vocab in com_to_all_vocab.items()} == {name: set(vocab) for name, vocab in com_vocab.items()}
+    assert com_to_unique_vocab == {name: command_processing.get_command_unique_vocab(data["input"], dict(vocab_counts)) for name, data in test_commands.items()}
+    assert com_to_unique_vocab["Number Only"] == com_to_unique_vocab["Open Only"] == []     # (commands without any STRING vocab)
+    assert com_to_unique_vocab["Say Thanks"] == []                                          # (a multi-word STRING is never a token itself, so the ANY has no count)
+
+def test_vocab_matrix():
+    vocab_to_com, com_to_unique_vocab, com_to_all_vocab = command_processing.build_input_vocab_indices(commands)
+    unique_vocab = [v for vocab in com_to_unique_vocab.values() for v in vocab]
+    matrix = vocab_matrix.CommandVocabMatrix(vocab_to_com, list(commands), unique_vocab)
+    input_text_list = [
+        "Hi there, can you please give me the time?",
+        "Please set a timer for 1 hour and 10 minutes, or stop the timer.",
+        "nothing to see here"
+    ]
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_vocab_matrix' + '__')
+    for text in input_text_list:
+        tokens, quotes = input_proc.get_basic_tokens_and_quote_sections(text)
+        scores = matrix.get_overlap_scores(tokens)
+        optional_print(f'\ninput: "{text}"')
+        optional_print("overlap scores:", scores)
+        expected_names = [name for token in tokens if token in unique_vocab for name in vocab_to_com.get(token)]
+        assert list(scores) == list(dict.fromkeys(expected_names))     # (in the order of the first input token each command shares)
+        assert all(score == expected_names.count(name) for name, score in scores.items())
+    # scoring all inputs at once must give the same scores as scoring each one:
+    token_lists = [input_proc.get_basic_tokens_and_quote_sections(text)[0] for text in input_text_list]
+    assert matrix.get_batch_overlap_scores(token_lists) == [matrix.get_overlap_scores(tokens) for tokens in token_lists]
+
 def test_command_checker():
     speech_processor = speech_proc.SpeechProcessor()
     input_text_list = [
@@ -199,17 +354,643 @@ def test_command_checker():
         optional_print("matching command:", return_value)
         assert return_value == expected_value
 
+def test_ordered_req_positions():
+    ordered_req = ("ORDERED", [("STRING", "set", None), ("STRING", "timer", None)], None)
+    input_texts = [
+        ("set it and then set timer", ["set", "timer"]),     # (the first "set" isn't next to "timer", but the second one is)
+        ("set a timer", None),
+        ("timer set", None),
+        ("set timer", ["set", "timer"])
+    ]
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_ordered_req_positions' + '__')
+    for text, expected_value in input_texts:
+        matched_value, final_value = command_processing._check_input_req_get_values(ordered_req, input_proc.InputAnalysis(text))
+        optional_print(f'\ninput: "{text}"', "\nmatched value:", matched_value)
+        assert matched_value == expected_value
+    # (adjacency is also checked when the sequence starts at the first token)
+    turn_on_req = ("ORDERED", [("STRING", "turn", None), ("STRING", "on", None)], None)
+    assert command_processing._check_input_req_get_values(turn_on_req, input_proc.InputAnalysis("turn the light on")) == (None, None)
+    # (each input token can only be used by one requirement)
+    set_reqs = [("STRING", "set", None), ("STRING", "set", None)]
+    assert command_processing._get_command_input_req_values(set_reqs, input_proc.InputAnalysis("set it"))[0] == ["set", None]
+    assert command_processing._get_command_input_req_values(set_reqs, input_proc.InputAnalysis("set it set"))[0] == ["set", "set"]
+
+def test_command_matcher():
+    matcher = command_processing.CommandMatcher(commands)
+    input_text_list = [
+        """Hi there, can you please give me the time?""",
+        """Create a new note with the content, I like to eat ... hot! spicy! cheese!""",
+        """Please set a timer for 1 hour and 10 minutes.""",
+        """What's the timer, is there any left?""",
+        """Please just shut up""",
+        """this shouldn't match anything"""
+    ]
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_command_matcher' + '__')
+    for text in input_text_list:
+        return_value = matcher.match(text, text, None)     # (text input is never re-transcribed)
+        optional_print(f'\ninput: "{text}"')
+        optional_print("candidates:", matcher.get_candidate_names(input_proc.get_basic_tokens_and_quote_sections(text)[0]))
+        optional_print("matching command:", return_value)
+        assert return_value == command_processing.get_commands_matching_input_reqs(text, text, commands, None)
+    # when a dict of commands is passed in, they're checked in its order (the same as `get_commands_matching_input_reqs()`):
+    text = "what is the date and time"
+    for names in [["Get Time", "Get Date"], ["Get Date", "Get Time"]]:
+        reordered = {name:commands[name] for name in names}
+        return_value = matcher.match(text, text, None, reordered)
+        optional_print(f'\ninput: "{text}"', "\ncommand order:", names, "\nmatching command:", return_value)
+        assert return_value == command_processing.get_commands_matching_input_reqs(text, text, reordered, None)
+        assert return_value[0] == names[0]
+
+def test_prefix_matcher():
+    matcher = command_processing.CommandMatcher(commands)
+    input_prefixes = [
+        ("what", (None, [])),                                               # ("Get Time" is partially met, so more input could still meet it)
+        ("what time", ('Get Time', ['what', 'time'])),
+        ("give me the time", (None, [])),                                   # (more input could still include "what", which comes before "give")
+        ("start a timer for ten minutes", (None, [])),                      # (more input could still add on to the duration)
+        ("start a timer for ten minutes please", ('Start Timer', ['timer', 'start', 600])),
+        ("create a note with content", (None, []))                          # (OPEN requirements are never met early)
+    ]
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_prefix_matcher' + '__')
+    for text, expected_value in input_prefixes:
+        return_value = matcher.match_prefix(text)
+        optional_print(f'\ninput prefix: "{text}"')
+        optional_print("early matching command:", return_value)
+        assert return_value == expected_value
+
+def test_preq_checker():
+    call_counts = {'TIMER_ACTIVE': 0, 'IS_SPEAKING': 0}
+    def counted(name, return_value):
+        def func():
+            call_counts[name] += 1
+            return return_value
+        return func
+    func_map = {**TEST_FUNC_MAP, 'TIMER_ACTIVE': counted('TIMER_ACTIVE', True), 'IS_SPEAKING': counted('IS_SPEAKING', False)}
+    checker = command_processing.PreReqChecker(command_data_loader.load_commands(COMMAND_DATA_FILEPATH, func_map))
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_preq_checker' + '__')
+    for i in range(3):
+        met_commands = checker.get_preq_met_commands()
+        optional_print(f'\ncycle {i}:', list(met_commands), call_counts)
+        assert list(met_commands) == ['Stop Timer', 'Get Timer Time']
+    assert call_counts == {'TIMER_ACTIVE': 1, 'IS_SPEAKING': 3}    # "TIMER_ACTIVE" is shared and cached until state changes, "IS_SPEAKING" isn't cached
+    checker.state_changed()
+    checker.get_preq_met_commands()
+    assert call_counts == {'TIMER_ACTIVE': 2, 'IS_SPEAKING': 4}
+
+def test_command_index():
+    from collections import Counter
+    unbound_commands = command_data_loader.load_unbound_commands(COMMAND_DATA_FILEPATH, TEST_FUNC_MAP)
+    index = command_index.CommandIndex(unbound_commands)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_command_index' + '__')
+    # remove a command, change a command, and add a command:
+    new_commands = dict(unbound_commands)
+    del new_commands["Get Date"]
+    new_commands["Get Time"] = {**new_commands["Get Time"], "input": [('STRING', 'clock', None)]}
+    new_commands["Get Weather"] = {"preqs": [], "input": [('STRING', 'weather', None), ('STRING', 'time', None)], "actions": [("SAY", (), None)], "exec": (None, "queue")}
+    new_commands["Say Thanks"] = {"preqs": [], "input": [('ANY', [('STRING', 'thank you', None), ('STRING', 'thanks', None)], None)], "actions": [("SAY", (), None)], "exec": (None, "queue")}     # (a multi-word STRING)
+    changes = index.update(new_commands)
+    optional_print('\n(added, removed, changed):', changes)
+    assert changes == (["Get Weather", "Say Thanks"], ["Get Date"], ["Get Time"])
+    assert list(index.commands) == list(new_commands)
+    # the incrementally updated indices must match indices generated from scratch:
+    full_indices = command_cache.get_command_indices(new_commands)
+    assert {token: Counter(names) for token, names in index.vocab_to_com.items()} == {token: Counter(names) for token, names in full_indices["vocab_to_com"].items()}
+    assert index.com_to_unique_vocab == full_indices["com_to_unique_vocab"]
+    assert {name: set(vocab) for name, vocab in index.com_to_all_vocab.items()} == {name: set(vocab) for name, vocab in full_indices["com_to_all_vocab"].items()}
+    assert index.update(new_commands) == ([], [], [])
+
+
+
+#-------- `action_executor` tests --------#
+
+def test_action_executor():
+    from threading import Event, Thread
+    from time import sleep
+    release = Event()
+    done_count = []
+    executor = ActionExecutor(max_workers=2, max_queue=5, on_action_done=lambda: done_count.append(1))
+    # a serialized command queues its extra actions, and a dropping command rejects them:
+    assert all(executor.submit("Serial", release.wait, settings=(1, "queue")) for i in range(3))
+    assert executor.submit("Dropper", release.wait, settings=(1, "drop"))
+    assert not executor.submit("Dropper", release.wait, settings=(1, "drop"))
+    sleep(0.1)
+    stats = executor.get_stats()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_action_executor' + '__')
+    optional_print('\nwhile blocked:', stats)
+    assert (stats["running"], stats["queue_depth"], stats["rejected"], stats["workers"]) == (2, 2, 1, 2)
+    # the queue is bounded:
+    assert all(executor.submit("Other", release.wait) for i in range(3))
+    assert not executor.submit("Other", release.wait)
+    waited = []
+    Thread(target=lambda: waited.append(executor.submit("Other", release.wait, wait=True)), daemon=True).start()
+    sleep(0.1)
+    assert not waited                                   # (waits for room in the queue, instead of being rejected)
+    release.set()
+    sleep(0.1)
+    stats = executor.get_stats()
+    optional_print('after release:', stats)
+    assert (stats["completed"], stats["queue_depth"], stats["rejected"], len(done_count)) == (8, 0, 2, 8) and waited == [True]
+    assert stats["commands"]["Serial"]["runs"] == 3
+    executor.shutdown()
+
+
+
+#-------- `speech_proc` tests --------#
+
+def test_stream_decoding():
+    import json
+    from concurrent.futures import Future
+    from time import sleep
+    import numpy as np
+    class FakeRecognizer:
+        def __init__(self):
+            self.chunks = []
+        def AcceptWaveform(self, data):
+            self.chunks.append(data)
+            return False
+        def PartialResult(self):
+            return json.dumps({"partial": f"[unk] {len(self.chunks)} chunks"})
+        def FinalResult(self):
+            return json.dumps({"text": f"streamed {len(self.chunks)} chunks"})
+    class FakeVoskT:
+        get_result_text = staticmethod(speech_proc._VoskT.get_result_text)
+        def _acquire(self, words_to_recognize):
+            return FakeRecognizer()
+        def _release(self, words_to_recognize, recognizer):
+            pass
+        def transcribe(self, audio_data, words_to_recognize=None):
+            return "decoded after capture"
+    speech_processor = speech_proc.SpeechProcessor(preload=False, streaming=True)
+    speech_processor._model_classes["vosk"] = FakeVoskT
+    speech_processor.load_model("vosk").result()
+    speech_processor.set_stream_vocabulary("start timer")
+    loud_chunk = np.array([-5000, 5000] * 1600, dtype=np.int16).tobytes()
+    quiet_chunk = np.zeros(3200, dtype=np.int16).tobytes()
+    for chunk in (loud_chunk, loud_chunk, loud_chunk, quiet_chunk):
+        speech_processor._SpeechProcessor__detect_phrase(chunk)
+    phrase = speech_processor.get_phrase(timeout=1)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_stream_decoding' + '__')
+    optional_print('\nstreamed transcription:', speech_processor.transcribe(phrase, "start timer"))
+    assert speech_processor.transcribe(phrase, "start timer") == "streamed 4 chunks"
+    assert speech_processor.transcribe(phrase, "stop timer") == "decoded after capture"     # (a different vocabulary can't use the streamed result)
+    assert speech_processor.get_phrase_id(phrase) == 1 and speech_processor.get_phrase_id(b"not streamed") is None
+    # (a phrase which is discarded while it's captured is never queued)
+    partials = []
+    speech_processor.set_partial_callback(lambda phrase_id, text: partials.append((phrase_id, text)))
+    for chunk in (loud_chunk, loud_chunk):
+        speech_processor._SpeechProcessor__detect_phrase(chunk)
+    for i in range(50):
+        if partials:
+            break
+        sleep(0.01)
+    speech_processor.discard_phrase(partials[0][0])
+    for chunk in (loud_chunk, quiet_chunk):
+        speech_processor._SpeechProcessor__detect_phrase(chunk)
+    optional_print('partial transcriptions:', partials)
+    assert partials[0] == (2, "1 chunks") and speech_processor.get_phrase(no_wait=True) is None     # (with any "[unk]" removed)
+    # (a failing partial callback doesn't stop the decoder)
+    speech_processor.set_partial_callback(lambda phrase_id, text: 1/0)
+    for chunk in (loud_chunk, loud_chunk, loud_chunk, loud_chunk, quiet_chunk):
+        speech_processor._SpeechProcessor__detect_phrase(chunk)
+    assert speech_processor.transcribe(speech_processor.get_phrase(timeout=1), "start timer") == "streamed 5 chunks"
+    # (a decoding which never finishes is only waited for up to `stream_result_timeout` seconds)
+    speech_processor.stream_result_timeout = 0.05
+    speech_processor._streamed[b"unfinished"] = ("start timer", Future(), 99)
+    assert speech_processor.transcribe(b"unfinished", "start timer") == "decoded after capture"
+
+def test_transcription_cache():
+    import numpy as np
+    transcribed = []
+    class FakeVoskT:
+        def transcribe(self, audio_data, words_to_recognize=None):
+            transcribed.append(words_to_recognize)
+            return f"decoded with {words_to_recognize}"
+    speech_processor = speech_proc.SpeechProcessor(preload=False)
+    speech_processor._model_classes["vosk"] = FakeVoskT
+    speech_processor.max_cached_transcriptions = 2
+    phrase = np.array([-5000, 5000] * 1600, dtype=np.int16).tobytes()
+    for vocabulary in ("start timer", "start timer", "stop timer", "start timer"):
+        speech_processor.transcribe(phrase, vocabulary)
+    assert transcribed == ["start timer", "stop timer"]             # (the same audio and vocabulary is only decoded once)
+    assert speech_processor.transcribe(bytes(phrase), "start timer") == "decoded with start timer" and len(transcribed) == 2  # (keyed by the audio, not the bytes object)
+    speech_processor.transcribe(phrase, "set timer")                # (evicts "stop timer", the least recently used)
+    speech_processor.transcribe(phrase, "stop timer")
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_transcription_cache' + '__')
+    optional_print('\ndecoded vocabularies:', transcribed)
+    optional_print('cache stats:', speech_processor.cache_stats)
+    assert transcribed == ["start timer", "stop timer", "set timer", "stop timer"]
+    assert speech_processor.cache_stats == {"hits": 3, "misses": 4}
+
+def test_model_startup_times():
+    from threading import Event
+    release = Event()
+    class SlowModel:
+        def __init__(self):
+            release.wait(5)
+    speech_processor = speech_proc.SpeechProcessor(preload=False)
+    speech_processor._model_classes = {"vosk": SlowModel, "whisper": SlowModel}
+    reported = []
+    speech_processor.set_model_loaded_callback(lambda name, seconds: reported.append(name))
+    futures = [speech_processor.load_model(name) for name in ("vosk", "whisper")]
+    assert reported == []                                           # (nothing is reported while the models are still loading)
+    release.set()
+    for future in futures:
+        future.result()
+    late_reported = []
+    speech_processor.set_model_loaded_callback(lambda name, seconds: late_reported.append(name))
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_model_startup_times' + '__')
+    optional_print('\nstartup times:', speech_processor.startup_times)
+    assert sorted(reported) == sorted(late_reported) == ["vosk", "whisper"]     # (a callback set after loading is called right away)
+    assert all(name in speech_processor.startup_times for name in ("recorder", "vosk", "whisper"))
+
+def test_transcription_vocab():
+    app_main.DEBUG_PRINT = False
+    app = app_main.App(COMMAND_DATA_FILEPATH, TEST_FUNC_MAP, HeadlessUI())
+    compiled = app._compiled
+    unique_vocab = compiled.get_unique_vocab(compiled.input_only_commands)
+    full_vocab = compiled.get_full_vocab(compiled.commands)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_transcription_vocab' + '__')
+    optional_print('\nunique vocab:', unique_vocab)
+    optional_print('\nfull vocab:', full_vocab)
+    assert len(set(unique_vocab)) == len(unique_vocab) and len(set(full_vocab)) == len(full_vocab)
+    assert unique_vocab[-2:] == ('quote', 'unquote') and full_vocab[-2:] == ('quote', 'unquote')
+    assert compiled.get_unique_vocab(dict(compiled.input_only_commands)) is unique_vocab    # (each set of commands is only computed once)
+    assert speech_proc.get_vosk_grammar("set the timer set timer") == '["set the timer", "[unk]"]'
+
+
+#-------- `main` (App) tests --------#
+
+def test_headless_app():
+    from time import sleep
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon"}
+    del func_map['SAY']                                 # (use the App's own SAY, which outputs to the UI)
+    ui = HeadlessUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    app.start()
+    ui.submit_text("what is the time")
+    for i in range(50):
+        if len(ui.outputs) >= 2:
+            break
+        sleep(0.02)
+    app.shutdown()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_headless_app' + '__')
+    optional_print('\noutputs:', list(ui.outputs))
+    assert list(ui.outputs) == [('"what is the time"', 'right'), ('the current time is noon', 'left')]
+    # a UI backend which doesn't implement every method fails as soon as it's instantiated:
+    from app.GUI_audio_voice.base_UI import BaseUI
+    class IncompleteUI(BaseUI):
+        def mainview_append(self, text, tag_name):
+            pass
+    try:
+        IncompleteUI()
+        assert False, "an incomplete UI backend should not be instantiable"
+    except TypeError:
+        pass
+
+def test_candidate_order():
+    from time import sleep
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon", 'GET_DATE': lambda: "Sunday"}
+    del func_map['SAY']
+    ui = HeadlessUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    app.start()
+    ui.submit_text("what is the date and time")        # (both "Get Date" and "Get Time" are met, but "date" is the first of their unique vocab in the input)
+    for i in range(50):
+        if len(ui.outputs) >= 2:
+            break
+        sleep(0.02)
+    app.shutdown()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_candidate_order' + '__')
+    optional_print('\noutputs:', list(ui.outputs))
+    assert list(ui.outputs) == [('"what is the date and time"', 'right'), ("today's date is Sunday", 'left')]
+
+def test_early_voice_match():
+    from time import sleep
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon"}
+    del func_map['SAY']
+    ui = HeadlessUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    app.start()
+    for phrase_id, partial_text in [(1, "what"), (1, "what time"), (1, "what time is it"), (2, "give me the"), (2, "give me the time")]:
+        ui._store_input("VOICE_PARTIAL", (phrase_id, partial_text))
+    for i in range(50):
+        if len(ui.outputs) >= 2:
+            break
+        sleep(0.02)
+    sleep(0.1)
+    app.shutdown()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_early_voice_match' + '__')
+    optional_print('\noutputs:', list(ui.outputs))
+    assert list(ui.outputs) == [('"what time"', 'right'), ('the current time is noon', 'left')]     # (each phrase can only meet a command once, and only if it's final)
+    # if the phrase was already stored as `VOICE` input before its partial transcription met a command, it's skipped:
+    class VoiceUI(HeadlessUI):
+        def transcribe_audio(self, audio, vocab=None):
+            return "what time is it"
+        def get_voice_phrase_id(self, audio):
+            return {b"phrase 1": 1, b"phrase 3": 3}.get(audio)
+    ui = VoiceUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    for input_type, data in [("VOICE_PARTIAL", (1, "what time")), ("VOICE", b"phrase 1"), ("VOICE", b"phrase 3")]:
+        ui._store_input(input_type, data)
+    app.start()
+    for i in range(50):
+        if len(ui.outputs) >= 4:
+            break
+        sleep(0.02)
+    sleep(0.1)
+    app.shutdown()
+    optional_print('outputs with queued phrases:', list(ui.outputs))
+    assert [text for text, tag_name in ui.outputs].count('the current time is noon') == 2    # (once for phrase 1, and once for phrase 3)
+
+def test_confident_transcription():
+    from time import sleep
+    class VoiceUI(HeadlessUI):
+        def __init__(self, words:list):
+            super().__init__()
+            self.words = words
+            self.n_transcriptions = 0
+        def transcribe_audio(self, audio, vocab=None):
+            self.n_transcriptions += 1
+            return speech_proc.Transcription(" ".join(word for word, conf in self.words), self.words)
+    assert speech_proc.Transcription("what time", [("what", 0.9), ("time", 0.8)]).confidence == 0.8
+    assert speech_proc.Transcription("what", [("what", 0.9), (speech_proc.UNKNOWN_WORD, 0.99)]).confidence == 0.0
+    assert speech_proc.Transcription("what time").confidence is None
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon"}
+    del func_map['SAY']
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_confident_transcription' + '__')
+    for words, expected_n_transcriptions in [([("what", 0.98), ("time", 0.97)], 1), ([("what", 0.5), ("time", 0.97)], 2)]:
+        ui = VoiceUI(words)
+        app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+        app.start()
+        ui._store_input("VOICE", b"audio")
+        for i in range(50):
+            if len(ui.outputs) >= 2 + expected_n_transcriptions - 1:
+                break
+            sleep(0.02)
+        app.shutdown()
+        optional_print(f'\nwords: {words}\ntranscriptions: {ui.n_transcriptions}\noutputs:', list(ui.outputs))
+        assert ui.n_transcriptions == expected_n_transcriptions and list(ui.outputs)[-1] == ('the current time is noon', 'left')
+
+def test_speculative_open_transcription():
+    from time import sleep
+    from threading import Event
+    class VoiceUI(HeadlessUI):
+        def __init__(self):
+            super().__init__()
+            self.second_vosk_transcription = Event()
+            self.ran_in_parallel = False
+            self.n_vosk_transcriptions = 0
+        def transcribe_audio(self, audio, vocab=None):
+            if vocab is None:                           # (whisper waits for the second vosk transcription, so it only finishes if both run in parallel)
+                self.ran_in_parallel = self.second_vosk_transcription.wait(1)
+                return "create a note with content buy some milk"
+            self.n_vosk_transcriptions += 1
+            if self.n_vosk_transcriptions == 2:
+                self.second_vosk_transcription.set()
+            return "create a note with content"
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP}
+    del func_map['SAY']
+    ui = VoiceUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    app.start()
+    ui._store_input("VOICE", b"audio")
+    for i in range(100):
+        if len(ui.outputs) >= 3:
+            break
+        sleep(0.02)
+    app.shutdown()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_speculative_open_transcription' + '__')
+    optional_print('\nran in parallel:', ui.ran_in_parallel, '\noutputs:', list(ui.outputs))
+    assert ui.ran_in_parallel and list(ui.outputs)[-1] == ('Writing a new note with the content: buy some milk', 'left')
+    assert list(command_processing.get_open_input_req_coms(commands)) == ['Create Quick Note']
+    # while a discarded speculative transcription is still running, the next phrase's OPEN value is transcribed directly, instead of waiting behind it:
+    class SlowVoiceUI(HeadlessUI):
+        def __init__(self):
+            super().__init__()
+            self.release_phrase_1 = Event()
+        def transcribe_audio(self, audio, vocab=None):
+            if vocab is None:
+                if audio == b"phrase 1":
+                    self.release_phrase_1.wait(5)       # (its result is discarded, as phrase 1 meets "Get Time")
+                return "create a note with content buy some milk"
+            return {b"phrase 1": "what time is it note", b"phrase 2": "create a note with content"}[audio]
+    func_map = {**func_map, 'GET_TIME': lambda: "noon"}
+    ui = SlowVoiceUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    app.start()
+    ui._store_input("VOICE", b"phrase 1")
+    ui._store_input("VOICE", b"phrase 2")
+    for i in range(100):
+        if ui.outputs and list(ui.outputs)[-1][0].startswith('Writing a new note'):
+            break
+        sleep(0.02)
+    outputs = list(ui.outputs)
+    ui.release_phrase_1.set()
+    app.shutdown()
+    optional_print('outputs with a discarded transcription still running:', outputs)
+    assert ('the current time is noon', 'left') in outputs and outputs[-1] == ('Writing a new note with the content: buy some milk', 'left')
+
+def test_resolve_batch():
+    from time import perf_counter, sleep
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon"}
+    del func_map['SAY']
+    ui = HeadlessUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui)
+    input_text_list = [
+        "what is the time",
+        "please start a timer for 5 minutes",
+        "nothing to see here",
+        "what is the time"
+    ]
+    results = app.resolve_batch(input_text_list, run_actions=True)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_resolve_batch' + '__')
+    for text, result in zip(input_text_list, results):
+        optional_print(f'\ninput: "{text}"')
+        optional_print("result:", result)
+    assert [name for name, values in results] == ["Get Time", "Start Timer", None, "Get Time"]
+    assert results[0] == results[3] and results[0][1] is not results[3][1]
+    sleep(0.1)
+    assert [text for text, tag_name in ui.outputs].count('the current time is noon') == 2
+    # a batch with more actions than the executor can queue waits for room, instead of dropping them:
+    app._executor.max_queue = 2
+    app.resolve_batch(["what is the time"] * 50, run_actions=True)
+    sleep(0.2)
+    assert [text for text, tag_name in ui.outputs].count('the current time is noon') == 52 and app._executor.get_stats()["rejected"] == 0
+    # throughput:
+    texts = input_text_list * 2500
+    start = perf_counter()
+    app.resolve_batch(texts)
+    optional_print(f'\nresolved {len(texts)} texts in {perf_counter() - start:.3f}s')
+    app.shutdown()
+
+def test_reload_commands():
+    from tempfile import TemporaryDirectory
+    from shutil import copy
+    from time import sleep
+    app_main.DEBUG_PRINT = False
+    with TemporaryDirectory() as temp_dir:
+        commands_path = copy(COMMAND_DATA_FILEPATH, temp_dir)
+        app = app_main.App(commands_path, TEST_FUNC_MAP, HeadlessUI(), use_command_cache=False)
+        app.commands_reload_interval = 0.05
+        app.start()
+        assert app.resolve_batch(["what is the clock"]) == [(None, [])]
+        # modify the command file, and wait for the app to notice and reload it:
+        with open(commands_path, 'r') as coms:
+            data = coms.read()
+        with open(commands_path, 'w') as coms:
+            coms.write(data.replace('"input": ["^get_1", "time"]', '"input": ["^get_1", "clock"]'))
+        for i in range(40):
+            results = app.resolve_batch(["what is the clock", "what is the time", "what is the date"])
+            if results[0][0]:
+                break
+            sleep(0.05)
+        optional_print('\n' + '-'*50)
+        optional_print('__' + 'test_reload_commands' + '__')
+        optional_print('\nresults after reload:', results)
+        assert [name for name, values in results] == ["Get Time", None, "Get Date"]
+        # an invalid command file is ignored, and the current commands are kept:
+        with open(commands_path, 'w') as coms:
+            coms.write('{')
+        sleep(0.2)
+        assert app.resolve_batch(["what is the clock"])[0][0] == "Get Time"
+        # if a reload fails partway through, the current commands (and index) are kept, and the next reload tries the same changes again:
+        app.commands_reload_interval = 1000                 # (reload manually from here on)
+        sleep(0.1)
+        with open(commands_path, 'w') as coms:
+            coms.write(data.replace('"input": ["^get_1", "time"]', '"input": ["^get_1", "hour"]'))
+        bind_commands = app_main.com_loader.bind_commands
+        app_main.com_loader.bind_commands = lambda *args: 1/0
+        try:
+            app.reload_commands()
+            assert False, "the reload should have failed"
+        except ZeroDivisionError:
+            pass
+        finally:
+            app_main.com_loader.bind_commands = bind_commands
+        assert app.resolve_batch(["what is the clock"])[0][0] == "Get Time" and "clock" in app._command_index.com_to_all_vocab["Get Time"]
+        assert app.reload_commands() == ([], [], ["Get Time"])
+        assert app.resolve_batch(["what is the hour"])[0][0] == "Get Time"
+        app.shutdown()
+
+
+#-------- `latency_tracer` tests --------#
+
+def test_latency_tracer():
+    from time import sleep
+    from app.latency_tracer import get_percentile
+    assert get_percentile(list(range(1, 101)), 50) == 50 and get_percentile(list(range(1, 101)), 99) == 99 and get_percentile([7], 95) == 7
+    app_main.DEBUG_PRINT = False
+    func_map = {**TEST_FUNC_MAP, 'GET_TIME': lambda: "noon"}
+    del func_map['SAY']
+    ui = HeadlessUI()
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, ui, trace_latency=True)
+    app.start()
+    for i in range(3):
+        ui.submit_text("what is the time")
+    ui.submit_text("nothing to see here")
+    for i in range(50):
+        if app.latency_tracer.get_stats()["traces"] >= 4:
+            break
+        sleep(0.02)
+    app.shutdown()
+    stats = app.latency_tracer.get_stats()
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_latency_tracer' + '__')
+    optional_print('\nstats:', stats)
+    optional_print('\nSTATS:', app.func_map["STATS"]())
+    assert stats["traces"] == 4
+    assert stats["stages"]["total"]["count"] == 4 and stats["stages"]["matching"]["count"] == 3 and stats["stages"]["action_dispatch"]["count"] == 3
+    assert list(stats["commands"]) == ["Get Time"] and stats["commands"]["Get Time"]["count"] == 3
+    assert 0 <= stats["commands"]["Get Time"]["p50"] <= stats["commands"]["Get Time"]["p99"] <= stats["commands"]["Get Time"]["max"]
+    # (while disabled, nothing is traced)
+    app = app_main.App(COMMAND_DATA_FILEPATH, func_map, HeadlessUI())
+    assert app.latency_tracer.start_trace().stages == {} and app.func_map["STATS"]() == "latency tracing is disabled"
+
+
+#-------- import time tests --------#
+
+def test_import_time():
+    import subprocess
+    HEAVY_MODULES = ('numpy', 'vosk', 'faster_whisper', 'pyttsx4', 'pyaudio', 'tkinter')
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "from app.input_command_processing import command_data_loader\n"
+        "load_time = time.perf_counter() - start\n"
+        "import app.main, sub_apps.timer.timer_alarm\n"
+        f"print(load_time, [m for m in {HEAVY_MODULES} if m in sys.modules])"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=dirname(dirname(path.abspath(__file__))), capture_output=True, text=True).stdout
+    load_time, heavy_imported = output.split(' ', 1)
+    optional_print('\n' + '-'*50)
+    optional_print('__' + 'test_import_time' + '__')
+    optional_print(f'\ncommand loader import time: {float(load_time)*1000:.1f}ms')
+    optional_print('heavy modules imported by `app.main` and `timer_alarm`:', heavy_imported)
+    assert float(load_time) < 0.1
+    assert heavy_imported.strip() == '[]'
+
 
 #----------------------#
 #----------------------#
 
 # test_command_data_loader()
+# test_command_cache()
 
 # test_basic_tokenizer()
+# test_token_spans()
 # test_word_to_number_converter()
 # test_word_to_duration_converter()
+# test_input_analysis()
 
 # test_unique_vocab_generator()
+# test_index_builder()
+# test_vocab_matrix()
 # test_command_checker()
+# test_ordered_req_positions()
+# test_command_matcher()
+# test_prefix_matcher()
+# test_preq_checker()
+# test_command_index()
+
+# test_action_executor()
+
+# test_stream_decoding()
+# test_transcription_cache()
+# test_model_startup_times()
+# test_transcription_vocab()
+
+# test_headless_app()
+# test_candidate_order()
+# test_early_voice_match()
+# test_confident_transcription()
+# test_speculative_open_transcription()
+# test_resolve_batch()
+# test_reload_commands()
+
+# test_latency_tracer()
+
+# test_import_time()
 
 # optional_print()
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Benchmark of the full vocabulary transcriber (faster-whisper) with different engine settings, using a fixed corpus of WAV files.
+
+Run standalone (`python tests/whisper_benchmark.py --corpus <directory>`, or `--help` for all options). Every WAV file in the corpus directory must be
+16kHz, mono, and 16-bit (the same as the audio captured by the app). If a WAV file has a `.txt` file with the same name next to it,
+it's used as the reference transcription, and the word error rate (WER) of each setting is reported along with its speed.
+
+For each setting, the real-time factor (RTF) is the time taken to transcribe all files divided by their total audio length
+(below 1 is faster than real time). The model is loaded, and the first file transcribed once, before timing starts.
+"""
+
+import sys
+import re
+import json
+import wave
+import argparse
+from os import path, listdir
+from os.path import dirname, join
+from time import perf_counter
+
+sys.path.append(dirname(dirname(path.abspath(__file__))))
+
+from app.GUI_audio_voice.speech_proc import _WhisperT, WHISPER_SETTINGS, WHISPER_CPU_SETTINGS
+
+#------
+
+RESULTS_FILEPATH = join(dirname(path.abspath(__file__)), "whisper_benchmark_results.json")
+
+# the named settings to benchmark (each overrides the machine's default settings: `WHISPER_SETTINGS` with a CUDA GPU, otherwise `WHISPER_CPU_SETTINGS`)
+BENCHMARK_SETTINGS = {
+    "default":                  {},
+    "unquantized beam":         WHISPER_SETTINGS,
+    "cpu int8 beam":            {**WHISPER_CPU_SETTINGS, "beam_size": 5},
+    "cpu int8 greedy":          WHISPER_CPU_SETTINGS,
+    "cpu int8 greedy vad":      {**WHISPER_CPU_SETTINGS, "vad_filter": True},
+    "cpu int8 greedy 8 threads":{**WHISPER_CPU_SETTINGS, "cpu_threads": 8},
+    "cpu float32 greedy":       {**WHISPER_CPU_SETTINGS, "compute_type": "float32"},
+    "base.en cpu int8 greedy":  {**WHISPER_CPU_SETTINGS, "model_size": "base.en"},
+    "small.en cpu int8 greedy": {**WHISPER_CPU_SETTINGS, "model_size": "small.en"}
+}
+
+SAMPLE_RATE = 16000
+
+#-------- Corpus --------#
+
+def load_corpus(dirpath:str) -> list:
+    """Load every WAV file in a directory, and return a list of (file name, audio data, audio seconds, reference text or None) tuples"""
+    corpus = []
+    for filename in sorted(listdir(dirpath)):
+        if not filename.lower().endswith(".wav"):
+            continue
+        with wave.open(join(dirpath, filename), 'rb') as wav:
+            assert wav.getframerate() == SAMPLE_RATE and wav.getnchannels() == 1 and wav.getsampwidth() == 2, f'"{filename}" must be 16kHz, mono, and 16-bit'
+            audio_data = wav.readframes(wav.getnframes())
+            seconds = wav.getnframes() / SAMPLE_RATE
+        reference_filepath = join(dirpath, filename[:-4] + ".txt")
+        reference = None
+        if path.exists(reference_filepath):
+            with open(reference_filepath, 'r') as file:
+                reference = file.read()
+        corpus.append((filename, audio_data, seconds, reference))
+    assert corpus, f'There are no WAV files in "{dirpath}"'
+    return corpus
+
+#-------- Scoring --------#
+
+def _get_words(text:str) -> list:
+    return re.findall(r"[\w']+", text.lower())
+
+def get_word_errors(reference:str, hypothesis:str) -> tuple[int, int]:
+    """Get the number of word errors (substitutions, deletions, and insertions) in a transcription, and the number of words in the reference"""
+    ref_words, hyp_words = _get_words(reference), _get_words(hypothesis)
+    distances = list(range(len(hyp_words) + 1))                 # the word edit distance, one reference word at a time
+    for i, ref_word in enumerate(ref_words, 1):
+        last_diagonal, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp_words, 1):
+            last_diagonal, distances[j] = distances[j], min(distances[j] + 1, distances[j - 1] + 1, last_diagonal + (ref_word != hyp_word))
+    return distances[-1], len(ref_words)
+
+#-------- Benchmark --------#
+
+def run_benchmark(corpus:list, settings:dict) -> dict:
+    """Transcribe every file in the corpus with a whisper transcriber using `settings`, and return its load time, RTF, and WER (if there are references)"""
+    start = perf_counter()
+    transcriber = _WhisperT(settings)
+    load_time = perf_counter() - start
+    transcriber.transcribe(corpus[0][1])                        # (warm up)
+    total_time = 0.0
+    total_errors, total_ref_words = 0, 0
+    transcriptions = {}
+    for filename, audio_data, seconds, reference in corpus:
+        start = perf_counter()
+        text = transcriber.transcribe(audio_data)
+        total_time += perf_counter() - start
+        transcriptions[filename] = str(text)
+        if reference is not None:
+            errors, n_words = get_word_errors(reference, text)
+            total_errors += errors
+            total_ref_words += n_words
+    audio_seconds = sum(seconds for filename, audio_data, seconds, reference in corpus)
+    return {
+        "settings":         transcriber.settings,
+        "load_time":        load_time,
+        "transcribe_time":  total_time,
+        "audio_seconds":    audio_seconds,
+        "rtf":              total_time / audio_seconds,
+        "wer":              total_errors / total_ref_words if total_ref_words else None,
+        "transcriptions":   transcriptions
+    }
+
+def print_results(results:dict):
+    print(f"\n{'settings':<30}{'load (s)':>10}{'RTF':>10}{'WER':>10}")
+    for name, result in results.items():
+        wer = f'{result["wer"]:.3f}' if result["wer"] is not None else '-'
+        print(f'{name:<30}{result["load_time"]:>10.2f}{result["rtf"]:>10.3f}{wer:>10}')
+
+#-------- Standalone Entry Point --------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the real-time factor of the whisper transcriber with different engine settings")
+    parser.add_argument("--corpus", required=True, help="the directory of WAV files (16kHz, mono, 16-bit) to transcribe, with optional reference .txt files")
+    parser.add_argument("--settings", nargs='+', default=list(BENCHMARK_SETTINGS), choices=list(BENCHMARK_SETTINGS), metavar="NAME", help="the names of the settings to benchmark (all by default)")
+    parser.add_argument("--output", default=RESULTS_FILEPATH, help="the JSON file to write the results to")
+    args = parser.parse_args()
+    if not path.isdir(args.corpus):
+        parser.error(f'the corpus directory "{args.corpus}" does not exist')
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} files, {sum(c[2] for c in corpus):.1f} seconds of audio")
+    results = {}
+    for name in args.settings:
+        print(f'benchmarking "{name}"...')
+        results[name] = run_benchmark(corpus, BENCHMARK_SETTINGS[name])
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    print_results(results)